@@ -0,0 +1,123 @@
+import os
+import struct
+
+import pygame
+
+RAW_HEADER = struct.Struct('<II?')  # width, height, has alpha
+
+
+class AssetCache:
+    """Decodes each image once and keeps scaled, display-converted copies per window size.
+
+    With a cache_dir the scaled pixels are also written there as raw RGB(A) files, so
+    the next start can skip decoding and scaling the PNG altogether. Cache files are
+    named after the source's size and modification time and go stale with it.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.images = {}  # path -> decoded surface, or None if it could not be loaded
+        self.scaled_images = {}  # (path, size) -> scaled surface, or None
+        self.covers = {}  # (path, size) -> (surface, position), or None
+
+    def load(self, path):
+        if path not in self.images:
+            try:
+                self.images[path] = pygame.image.load(path)
+            except (pygame.error, FileNotFoundError):
+                print(f"Warning: Could not load {path}")
+                self.images[path] = None
+        return self.images[path]
+
+    def raw_cache_path(self, path, size):
+        stat = os.stat(path)
+        name = f"{os.path.basename(path)}-{size[0]}x{size[1]}-{stat.st_size}-{stat.st_mtime_ns}.raw"
+        return os.path.join(self.cache_dir, name)
+
+    def read_raw(self, cache_path):
+        with open(cache_path, 'rb') as f:
+            width, height, has_alpha = RAW_HEADER.unpack(f.read(RAW_HEADER.size))
+            return pygame.image.frombytes(f.read(), (width, height), 'RGBA' if has_alpha else 'RGB')
+
+    def write_raw(self, cache_path, surface):
+        has_alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary name first so a half-written file is never picked up
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(RAW_HEADER.pack(surface.get_width(), surface.get_height(), has_alpha))
+            f.write(pygame.image.tobytes(surface, 'RGBA' if has_alpha else 'RGB'))
+        os.replace(temp_path, cache_path)
+
+    def scale_to_cover(self, path, size):
+        image = self.load(path)
+        if image is None:
+            return None
+        window_width, window_height = size
+        bg_ratio = image.get_width() / image.get_height()
+
+        # Calculate new dimensions that maintain aspect ratio and fill screen
+        if window_width/window_height > bg_ratio:
+            new_width = window_width
+            new_height = int(window_width / bg_ratio)
+        else:
+            new_height = window_height
+            new_width = int(window_height * bg_ratio)
+
+        return pygame.transform.scale(image, (new_width, new_height))
+
+    def scaled(self, path, size):
+        """The image scaled to fill size keeping its aspect ratio, or None if it can't be loaded.
+
+        Only decodes, scales and reads or writes the raw cache, none of which needs the
+        display, so it can run on a background thread while the window is already up.
+        """
+        key = (path, size)
+        if key in self.scaled_images:
+            return self.scaled_images[key]
+
+        surface = None
+        cache_path = None
+        if self.cache_dir and os.path.exists(path):
+            cache_path = self.raw_cache_path(path, size)
+            if os.path.exists(cache_path):
+                try:
+                    surface = self.read_raw(cache_path)
+                except (OSError, ValueError, struct.error):
+                    surface = None
+        if surface is None:
+            surface = self.scale_to_cover(path, size)
+            if surface is not None and cache_path:
+                try:
+                    self.write_raw(cache_path, surface)
+                except OSError:
+                    pass  # The raw cache is only an optimisation
+
+        self.scaled_images[key] = surface
+        return surface
+
+    def cover(self, path, size):
+        """The image scaled to fill size keeping its aspect ratio, and the position that centres it.
+
+        Returns None if the image can't be loaded.
+        """
+        key = (path, size)
+        if key in self.covers:
+            return self.covers[key]
+
+        surface = self.scaled(path, size)
+        self.scaled_images.pop(key, None)  # Only the display-converted copy is kept
+        if surface is None:
+            self.covers[key] = None
+            return None
+
+        if pygame.display.get_surface() is not None:
+            if surface.get_flags() & pygame.SRCALPHA:
+                surface = surface.convert_alpha()
+            else:
+                surface = surface.convert()
+
+        # Center the image
+        position = ((size[0] - surface.get_width()) // 2, (size[1] - surface.get_height()) // 2)
+        self.covers[key] = (surface, position)
+        return self.covers[key]
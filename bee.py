@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+SEGMENT_OFFSETS = (-8, 0, 8)  # Body segments along the heading, tail to head
+SEGMENT_RADIUS = 10
+# Circle around the player position that contains every body segment
+BOUND_RADIUS = max(abs(offset) for offset in SEGMENT_OFFSETS) + SEGMENT_RADIUS
+
+
+class BeeTransform:
+    """Positions of the bee's body segments, wings and antennae for one pose.
+
+    update() only redoes the trigonometry when the position or angle changed, so the
+    hitbox and the drawing code can both ask for the parts as often as they like.
+    """
+
+    def __init__(self):
+        self.pose = None
+        self.segments = []
+        self.segment_x = np.zeros(len(SEGMENT_OFFSETS))
+        self.segment_y = np.zeros(len(SEGMENT_OFFSETS))
+        self.wings = []
+        self.antenna_base = (0, 0)
+        self.antenna_tips = []
+
+    def update(self, x, y, angle):
+        pose = (x, y, angle)
+        if pose == self.pose:
+            return self
+        self.pose = pose
+
+        direction = math.radians(angle)
+        cos, sin = math.cos(direction), math.sin(direction)
+
+        self.segments = [(x + offset * cos, y - offset * sin) for offset in SEGMENT_OFFSETS]
+        for i, (segment_x, segment_y) in enumerate(self.segments):
+            self.segment_x[i] = segment_x
+            self.segment_y[i] = segment_y
+
+        # Right and left wing
+        self.wings = [(x + 5 * cos + 12 * math.cos(wing_angle), y - 5 * sin + 12 * math.sin(wing_angle))
+                      for wing_angle in (direction + math.pi/2, direction - math.pi/2)]
+
+        base_x, base_y = x + 10 * cos, y - 10 * sin
+        self.antenna_base = (base_x, base_y)
+        self.antenna_tips = [(base_x + 8 * math.cos(antenna_angle), base_y - 8 * math.sin(antenna_angle))
+                             for antenna_angle in (direction - math.pi/6, direction + math.pi/6)]
+        return self
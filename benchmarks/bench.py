@@ -0,0 +1,291 @@
+"""Headless benchmarks for the simulation and render paths.
+
+Each scenario sets up a fixed, seeded situation and runs it for a number of frames
+with the frame profiler attached, reporting the mean time per stage in ns/frame.
+Every scenario is run REPEATS times, in rounds over all scenarios, and the fastest
+of those means is kept, for the baseline and for comparing with it alike, so one
+noisy run or a slow stretch of the machine doesn't fail the comparison.
+A second, shorter pass under tracemalloc measures the peak memory allocated per
+frame and how often the garbage collector ran.
+
+    python benchmarks/bench.py                 run everything, compare with the baseline
+    python benchmarks/bench.py bubbles_500     run some scenarios only
+    python benchmarks/bench.py --save          store this run as the new baseline
+
+Timings are only comparable on the same machine, so refresh the baseline with
+--save when switching machines.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from profiler import Profiler, STAGES, BULLETS, DRAW, FLIP  # noqa: E402
+from simulation import Simulation, Inputs, WINDOW_WIDTH, WINDOW_HEIGHT  # noqa: E402
+from swarm import SwarmSimulation, SwarmConfig  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+REGRESSION_THRESHOLD = 1.25  # Flag a stage that got 25% slower than the baseline
+NOISE_FLOOR_NS = 20000  # Ignore changes in stages this cheap
+REPEATS = 5  # Runs per scenario; the fastest is kept, both for the baseline and for comparing
+
+
+def make_simulation(seed=1):
+    sim = Simulation(seed)
+    sim.lives = 10**9  # Bubbles run into the bee all the time; never end the game
+    sim.bubble_spawn_delay = float('inf')
+    sim.last_score_update = float('inf')
+    return sim
+
+
+def make_swarm(seed=1):
+    # Spawning stays on, up to the swarm's bubble cap
+    sim = SwarmSimulation(SwarmConfig(), seed)
+    sim.lives = 10**9
+    sim.last_score_update = float('inf')
+    return sim
+
+
+def fill(sim, count, radius=(10, 40), speed=0.5):
+    """Add count bubbles on a jittered grid over the window, so they start out mostly apart"""
+    rng = random.Random(count)
+    columns = math.ceil(math.sqrt(count))
+    spacing = WINDOW_WIDTH / columns
+    for i in range(count):
+        row, column = divmod(i, columns)
+        r = rng.uniform(*radius)
+        sim.bubbles.add((column + rng.uniform(0.3, 0.7)) * spacing, (row + rng.uniform(0.3, 0.7)) * spacing,
+                        rng.uniform(-speed, speed), rng.uniform(-speed, speed), r,
+                        rng.choice(((173, 216, 230), (221, 160, 221))), -int(r // 3))
+
+
+def idle_inputs(frame):
+    return Inputs(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2, False)
+
+
+def firing_inputs(frame):
+    # Sweep the crosshair around the bee so the stingers fan out
+    angle = frame / 20
+    return Inputs(int(WINDOW_WIDTH / 2 + 300 * math.cos(angle)),
+                  int(WINDOW_HEIGHT / 2 + 300 * math.sin(angle)), True)
+
+
+class Scenario:
+    """A simulation set up by setup(), stepped once per frame with inputs(frame)"""
+
+    def __init__(self, name, setup, inputs=idle_inputs, frames=300, per_frame=None, make=make_simulation):
+        self.name = name
+        self.setup = setup
+        self.inputs = inputs
+        self.frames = frames
+        self.per_frame = per_frame  # Extra work each frame, given (sim, frame)
+        self.make = make
+
+    def prepare(self):
+        sim = self.make()
+        self.setup(sim)
+        return sim
+
+    def frame(self, sim, frame):
+        if self.per_frame is not None:
+            self.per_frame(sim, frame)
+        sim.step(self.inputs(frame))
+
+
+class RenderScenario(Scenario):
+    """Runs the game's draw() and present() after every step, on the dummy display"""
+
+    games = {}  # Swarm mode or not -> Game
+    game = None  # The one the running scenario draws with
+
+    def prepare(self):
+        swarm = self.make is make_swarm
+        if swarm not in RenderScenario.games:
+            import bubble_bee
+            # An in-memory score store, so benchmarking never writes a database next to the game
+            RenderScenario.games[swarm] = bubble_bee.Game(swarm_config=SwarmConfig() if swarm else None,
+                                                          scores_path=':memory:')
+        game = RenderScenario.game = RenderScenario.games[swarm]
+        game.reset_game()
+        game.sim = sim = self.make()
+        game.needs_full_redraw = True
+        self.setup(sim)
+        return sim
+
+    def frame(self, sim, frame):
+        super().frame(sim, frame)
+        game = RenderScenario.game
+        if sim.hurt_active():
+            game.update_hurt_effect()
+        game.draw(0.5)
+        if sim.profiler is not None:
+            sim.profiler.lap(DRAW)
+        game.present()
+        if sim.profiler is not None:
+            sim.profiler.lap(FLIP)
+
+
+def split_cascade(sim, frame):
+    # Split the 10 newest bubbles, so halves get split again and again, and keep big
+    # bubbles coming so the cascade never runs dry
+    if len(sim.bubbles) < 100:
+        fill(sim, 16, radius=(80, 100), speed=0.2)
+    n = len(sim.bubbles)
+    sim.split_bubbles(list(range(n - 10, n)))
+    if sim.profiler is not None:
+        sim.profiler.lap(BULLETS)
+
+
+def shake(sim, frame):
+    # Restart the hurt effect every half second
+    if frame % 30 == 0:
+        sim.hurt_effect_start = sim.time_ms
+
+
+def swarm_fill(sim):
+    # Whole radii like the swarm spawns, which only need a few dozen distinct sprites
+    fill(sim, 10000, radius=(2, 5), speed=0.6)
+    bubbles = sim.bubbles
+    bubbles.radius[:bubbles.count] = bubbles.radius[:bubbles.count].round()
+
+
+def sustained_fire(sim):
+    fill(sim, 100, radius=(20, 80))
+    sim.shot_delay = 0
+
+
+SCENARIOS = [
+    Scenario('bubbles_50', lambda sim: fill(sim, 50)),
+    Scenario('bubbles_500', lambda sim: fill(sim, 500)),
+    Scenario('bubbles_5000', lambda sim: fill(sim, 5000, radius=(4, 6)), frames=60),
+    Scenario('split_cascade', lambda sim: fill(sim, 16, radius=(80, 100), speed=0.2),
+             per_frame=split_cascade),
+    Scenario('sustained_fire', sustained_fire, inputs=firing_inputs),
+    RenderScenario('render_500', lambda sim: fill(sim, 500)),
+    RenderScenario('render_shake', lambda sim: fill(sim, 100), per_frame=shake),
+    Scenario('swarm_10k', swarm_fill, inputs=firing_inputs, frames=120, make=make_swarm),
+    RenderScenario('render_swarm', swarm_fill, inputs=firing_inputs, frames=120, make=make_swarm),
+]
+
+
+def time_run(scenario):
+    sim = scenario.prepare()
+    profiler = Profiler(capacity=scenario.frames)
+    sim.profiler = profiler
+    gc.collect()
+    start = time.perf_counter_ns()
+    for frame in range(scenario.frames):
+        profiler.begin_frame()
+        scenario.frame(sim, frame)
+        profiler.end_frame(len(sim.bubbles), len(sim.bullets))
+    elapsed = time.perf_counter_ns() - start
+    rows = profiler.rows()
+    return elapsed / scenario.frames, profiler.stage_ns[rows].mean(axis=0), len(sim.bubbles)
+
+
+def fastest(scenario, runs):
+    """The fastest of several runs, per frame and per stage: noise only ever adds time, so
+    the minimum is the steadiest figure to compare"""
+    stage_ns = np.min([stages for frame_ns, stages, bubbles in runs], axis=0)
+    return {
+        'frames': scenario.frames,
+        'repeats': len(runs),
+        'frame_ns': int(min(frame_ns for frame_ns, stages, bubbles in runs)),
+        'stages_ns': {stage: int(ns) for stage, ns in zip(STAGES, stage_ns.tolist()) if ns},
+        'bubbles_end': runs[-1][2],
+    }
+
+
+def measure_allocations(scenario, frames=20):
+    sim = scenario.prepare()
+    gc.collect()
+    collections = sum(stats['collections'] for stats in gc.get_stats())
+    tracemalloc.start()
+    peak_total = 0
+    for frame in range(frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        scenario.frame(sim, frame)
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    collections = sum(stats['collections'] for stats in gc.get_stats()) - collections
+    return {
+        'alloc_peak_bytes': int(peak_total / frames),
+        'gc_per_100_frames': round(collections * 100 / frames, 1),
+    }
+
+
+def compare(name, result, baseline):
+    """Lines describing the stages that got slower than in the baseline"""
+    old = baseline.get(name)
+    if not old:
+        return []
+    regressions = []
+    for stage, ns in result['stages_ns'].items():
+        old_ns = old['stages_ns'].get(stage)
+        if old_ns and ns > NOISE_FLOOR_NS and ns > old_ns * REGRESSION_THRESHOLD:
+            regressions.append(f"  {name}.{stage}: {old_ns} -> {ns} ns/frame ({ns / old_ns:.2f}x)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BubbleBee benchmarks")
+    parser.add_argument('scenarios', nargs='*', help="scenario names (default: all)")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument('--repeats', type=int, default=REPEATS,
+                        help="runs per scenario, of which the fastest counts (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    # Round after round of every scenario rather than each one's runs back to back, so a
+    # stretch where the whole machine runs slow can't catch all runs of one scenario
+    runs = {scenario.name: [] for scenario in scenarios}
+    for _ in range(args.repeats):
+        for scenario in scenarios:
+            runs[scenario.name].append(time_run(scenario))
+
+    results = {}
+    regressions = []
+    for scenario in scenarios:
+        result = fastest(scenario, runs[scenario.name])
+        result.update(measure_allocations(scenario))
+        results[scenario.name] = result
+        stages = "  ".join(f"{stage} {ns / 1e6:.2f}" for stage, ns in result['stages_ns'].items())
+        print(f"{scenario.name:15} {result['frame_ns'] / 1e6:7.2f} ms/frame  [{stages}]  "
+              f"alloc {result['alloc_peak_bytes'] / 1024:.0f} KiB/frame  "
+              f"gc {result['gc_per_100_frames']}/100 frames")
+        regressions += compare(scenario.name, result, baseline)
+
+    if regressions:
+        print("Slower than the baseline:")
+        print("\n".join(regressions))
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    return 1 if regressions and not args.save else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import math
+
+import numpy as np
+
+# Extra padding on every query so float rounding at cell borders can never drop a real contact
+QUERY_MARGIN = 1.0
+
+
+class SpatialHash:
+    """Uniform grid that buckets circles by every cell their bounding box covers"""
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}  # key -> (x0, y0, x1, y1) cell range the key is stored under
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+
+    def cell_range(self, x, y, radius):
+        size = self.cell_size
+        return (math.floor((x - radius) / size), math.floor((y - radius) / size),
+                math.floor((x + radius) / size), math.floor((y + radius) / size))
+
+    def insert(self, key, x, y, radius):
+        cell_range = self.cell_range(x, y, radius)
+        self.entries[key] = cell_range
+        x0, y0, x1, y1 = cell_range
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [key]
+                else:
+                    bucket.append(key)
+
+    def remove(self, key):
+        x0, y0, x1, y1 = self.entries.pop(key)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells[(cx, cy)]
+                bucket.remove(key)
+                if not bucket:
+                    del cells[(cx, cy)]
+
+    def move(self, key, x, y, radius):
+        # Most moves stay inside the same cells, so only rebucket when the range changes
+        if self.cell_range(x, y, radius) != self.entries[key]:
+            self.remove(key)
+            self.insert(key, x, y, radius)
+
+    def query(self, x, y, radius):
+        """Return every key whose cells overlap the bounding box of the given circle"""
+        x0, y0, x1, y1 = self.cell_range(x, y, radius + QUERY_MARGIN)
+        cells = self.cells
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+
+# Neighbouring cells a pair search looks at: the cell itself and half of the eight
+# around it, so every pair of neighbouring cells is visited exactly once
+FORWARD_NEIGHBOURS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+ALL_NEIGHBOURS = tuple((cx, cy) for cx in (-1, 0, 1) for cy in (-1, 0, 1))
+CELLS_PER_CIRCLE = 4  # Cells get bigger when circles are spread thinner than this
+
+
+class SortedGrid:
+    """Uniform grid over NumPy arrays of circles, for batched queries on many at once.
+
+    Built from scratch every step: the circles are sorted by cell and a table holds
+    where each cell's run starts, so the members of a whole array of cells are found
+    with a few array lookups. Cells are at least as wide as the largest circle, so
+    any circle a circle or point can touch sits in a neighbouring cell. Where
+    SpatialHash suits a sequential pass that moves circles one at a time, this suits
+    passes that handle all of them at once.
+    """
+
+    def __init__(self, x, y, radius):
+        n = len(x)
+        self.left = float(x.min(initial=0))
+        self.top = float(y.min(initial=0))
+        width = float(x.max(initial=0)) - self.left
+        height = float(y.max(initial=0)) - self.top
+        self.cell_size = max(2 * float(radius.max(initial=0)), math.sqrt(width * height / (CELLS_PER_CIRCLE * max(n, 1))), 1.0)
+        # One empty cell of padding all around, so neighbours of occupied cells are always in the table
+        self.columns = int(width // self.cell_size) + 3
+        self.rows = int(height // self.cell_size) + 3
+        self.cells = self.cells_of(x, y)
+        # Stable sorts of 16 bit keys are radix sorts, several times faster than a comparison sort
+        keys = self.cells.astype(np.uint16) if self.columns * self.rows <= 1 << 16 else self.cells
+        self.order = np.argsort(keys, kind='stable')
+        self.counts = np.bincount(self.cells, minlength=self.columns * self.rows)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def cells_of(self, x, y):
+        """Cell numbers of points, clamped to the occupied part of the grid"""
+        column = np.clip(((x - self.left) // self.cell_size).astype(np.intp) + 1, 1, self.columns - 2)
+        row = np.clip(((y - self.top) // self.cell_size).astype(np.intp) + 1, 1, self.rows - 2)
+        return column * self.rows + row
+
+    def members(self, cells):
+        """For an array of cells: (which cell, circle index) for every circle in them"""
+        counts = self.counts[cells]
+        owner = np.repeat(np.arange(len(cells)), counts)
+        # Position of each member in the sorted order: its cell's start plus its rank in the cell
+        shift = np.repeat(self.starts[cells] - (np.cumsum(counts) - counts), counts)
+        return owner, self.order[np.arange(len(owner)) + shift]
+
+    def pairs(self):
+        """Every pair (i, j) of circles in the same or neighbouring cells, each pair once"""
+        firsts, seconds = [], []
+        for offset_x, offset_y in FORWARD_NEIGHBOURS:
+            i, j = self.members(self.cells + (offset_x * self.rows + offset_y))
+            if offset_x == 0 and offset_y == 0:
+                keep = i < j
+                i, j = i[keep], j[keep]
+            firsts.append(i)
+            seconds.append(j)
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+    def near_points(self, xs, ys):
+        """Every pair (point, circle) of a point and a circle in the same or a neighbouring cell.
+
+        Points outside the grid count as being in its nearest cell, which is harmless:
+        the circles they get paired with are too far away to contain them.
+        """
+        cells = self.cells_of(np.asarray(xs), np.asarray(ys))
+        points, circles = [], []
+        for offset_x, offset_y in ALL_NEIGHBOURS:
+            point, circle = self.members(cells + (offset_x * self.rows + offset_y))
+            points.append(point)
+            circles.append(circle)
+        return np.concatenate(points), np.concatenate(circles)
+
+
+class StripIndex:
+    """The circles reaching into an axis-aligned strip, sorted along it.
+
+    For placing new circles in the strip: bubbles spawn just outside one edge of the
+    window, so only the bubbles near that edge can be in the way. They are gathered
+    once and every candidate is then checked with a binary search and an exact test
+    against the few circles beside it, however many there are elsewhere.
+    """
+
+    def __init__(self, x, y, radius, horizontal, low, high):
+        """Index the circles reaching into low <= y <= high for a horizontal strip, or low <= x <= high"""
+        across = y if horizontal else x
+        inside = np.flatnonzero((across + radius >= low - QUERY_MARGIN) & (across - radius <= high + QUERY_MARGIN))
+        along = (x if horizontal else y)[inside]
+        order = np.argsort(along)
+        self.horizontal = horizontal
+        self.along = along[order]
+        self.x = x[inside[order]]
+        self.y = y[inside[order]]
+        self.radius = radius[inside[order]]
+        self.max_radius = float(self.radius.max(initial=0))
+
+    def overlaps(self, xs, ys, radius):
+        """For each circle, whether it overlaps one of the indexed circles; they must lie within the strip"""
+        xs, ys, radius = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float), np.asarray(radius, dtype=float)
+        along = xs if self.horizontal else ys
+        reach = radius + self.max_radius + QUERY_MARGIN
+        start = np.searchsorted(self.along, along - reach, 'left')
+        counts = np.searchsorted(self.along, along + reach, 'right') - start
+        owner = np.repeat(np.arange(len(xs)), counts)
+        index = np.repeat(start, counts) + np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        hit = np.hypot(xs[owner] - self.x[index], ys[owner] - self.y[index]) < radius[owner] + self.radius[index]
+        result = np.zeros(len(xs), dtype=bool)
+        result[owner[hit]] = True
+        return result
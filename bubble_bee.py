@@ -1,174 +1,154 @@
+import time
+
+# Startup is timed from here, before anything else is imported, so the imports,
+# pygame.init() and opening the window are all included
+STARTED_AT = time.perf_counter()
+
 import pygame
 import random
 import math
 import sys
 import os
+import argparse
+import gc
+
+from bee import BeeTransform, SEGMENT_RADIUS
+from simulation import Simulation, Inputs, WINDOW_WIDTH, WINDOW_HEIGHT, STEP_MS
+from replay import ReplayRecorder
+from sprites import BubbleSpriteCache, CloudLayer, StingerSprites
+from text_cache import TextCache
+from assets import AssetCache
+from profiler import Profiler, STAGES, INPUT, DRAW, FLIP
+from quality import QualityController
+from scores import ScoreStore
+from preload import Preloader
+from swarm import SwarmSimulation, SwarmConfig
+import leaderboard
+
+IMPORTED_AT = time.perf_counter()
 
 # Initialize Pygame
 pygame.init()
 
 # Constants
-WINDOW_WIDTH = 1024
-WINDOW_HEIGHT = 1024
-FPS = 60
+FPS = 60  # Default render rate cap; physics always runs at a fixed STEP_MS
+MAX_STEPS_PER_FRAME = 5  # Catch-up limit so a slow frame can't snowball into a spiral of death
+PROFILER_PANEL_SIZE = (360, 160)
+MENU_TIMEOUT_MS = 500  # Menus wake up this often without input, to blink the cursor
+LEADERBOARD_UPDATED = pygame.event.custom_type()  # Posted by the leaderboard client's thread
+PRELOADED = pygame.event.custom_type()  # Posted once the title image and scores are loaded
+TITLE_IMAGE = 'bubblebee.png'
+
+# What run() is doing; everything but PLAYING is a menu screen waiting for input
+START, PLAYING, NAME_ENTRY, HIGH_SCORES = 'start', 'playing', 'name_entry', 'high_scores'
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
+GREEN = (0, 200, 0)
 BACKGROUND_COLOR = (135, 206, 235)  # Light blue sky
 CLOUD_COLOR = (255, 255, 255)  # White
 CLOUD_SHADOW = (220, 220, 220)  # Light grey
-MIN_SPEED_FACTOR = 0.2  # 10% of original speed
 YELLOW = (255, 223, 0)  # Bee yellow color
-PLAYER_SPEED = 0.05  # Speed multiplier for player movement (0.1 = slow, 0.5 = fast)
-
-# Add bubble colors
-BUBBLE_COLORS = [
-    (173, 216, 230),  # light blue
-    (221, 160, 221),  # plum
-    (152, 251, 152),  # pale green
-    (255, 182, 193),  # light pink
-    (238, 232, 170),  # pale goldenrod
-]
-
-class Cloud:
-    def __init__(self):
-        self.x = random.randint(-100, WINDOW_WIDTH)
-        self.y = random.randint(0, WINDOW_HEIGHT//2)
-        self.speed = random.uniform(0.2, 0.5)
-        self.size = random.randint(40, 100)
-        self.circles = [(random.randint(-20, 20), random.randint(-20, 20), 
-                        random.randint(20, 40)) for _ in range(5)]
-
-    def move(self):
-        self.x += self.speed
-        if self.x > WINDOW_WIDTH + 100:
-            self.x = -100
-            self.y = random.randint(0, WINDOW_HEIGHT//2)
-
-    def draw(self, screen):
-        for offset_x, offset_y, radius in self.circles:
-            # Draw cloud shadow
-            pygame.draw.circle(screen, CLOUD_SHADOW,
-                             (int(self.x + offset_x), int(self.y + offset_y + 2)),
-                             radius)
-            # Draw cloud
-            pygame.draw.circle(screen, CLOUD_COLOR,
-                             (int(self.x + offset_x), int(self.y + offset_y)),
-                             radius)
 
 class Game:
-    def __init__(self):
+    def __init__(self, record_path=None, fps=FPS, dirty_rects=False, asset_cache_dir=None,
+                 continuous=False, profile_path=None, adaptive_quality=True, scores_path='high_scores.db',
+                 leaderboard_address=None, startup_timing=False, swarm_config=None):
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Bubble Pop")
         self.clock = pygame.time.Clock()
+        self.fps = fps
+        self.text = TextCache()
+        self.assets = AssetCache(asset_cache_dir)
+        self.bubble_sprites = BubbleSpriteCache(WHITE)
+        self.cloud_layer = CloudLayer((WINDOW_WIDTH, WINDOW_HEIGHT), BACKGROUND_COLOR,
+                                      CLOUD_COLOR, CLOUD_SHADOW)
+        self.dirty_rects = dirty_rects
+        self.frame_rects = []  # Screen areas drawn this frame
+        self.last_rects = []  # Screen areas drawn last frame, to be erased
+        self.continuous = continuous
+        self.swarm_config = swarm_config  # Play swarm mode with these settings
+        self.stinger_sprites = StingerSprites(BLACK) if swarm_config is not None else None
+        self.bee_pose = BeeTransform()  # Bee parts at the interpolated render position
+        self.profiler = Profiler()
+        self.profile_path = profile_path  # Frame timings are exported here on quit
+        self.show_profiler = False  # Toggled with F3
+        # Uncapped (fps 0) still aims for at least one frame per physics step
+        self.quality = QualityController(1000 / fps if fps else STEP_MS)
+        self.adaptive_quality = adaptive_quality
+        self.profiler_panel = pygame.Surface(PROFILER_PANEL_SIZE, pygame.SRCALPHA)
+        # Semi-transparent red laid over the screen while the bee is hurt
+        self.flash_overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+        self.flash_overlay.fill(RED)
+        self.flash_overlay.set_alpha(100)
+        self.record_path = record_path
+        self.recorder = None
+        self.games_played = 0
         self.reset_game()
         pygame.mouse.set_visible(False)
-        self.show_start_screen()
-        self.player_pos = [WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2]
-        self.player_angle = 0
-        self.high_scores = self.load_high_scores()
-        self.spawn_level = 1
-        self.warning_time = 0
-        self.showing_warning = False
-        self.clouds = [Cloud() for _ in range(5)]
-        self.bubbles = []
-        self.last_bubble_spawn = 0
-        self.bubble_spawn_delay = 2000  # Start with 2 seconds
-        self.bullets = []
-        self.last_shot_time = 0
-        self.shot_delay = 250  # Delay between shots in milliseconds
-        self.bullet_speed = 10
-        self.min_bubble_radius = 10  # Minimum radius before bubble pops
-        self.font = pygame.font.Font(None, 36)
+        # The game reads the mouse position directly; motion events would only wake the menus
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
+        self.state = START
+        # The title image and the score database load in the background while the start
+        # screen is already up; finish_loading() takes them over
+        self.preloader = Preloader([
+            ('title', lambda: self.assets.scaled(TITLE_IMAGE, (WINDOW_WIDTH, WINDOW_HEIGHT))),
+            ('scores', lambda: ScoreStore(scores_path)),
+        ], PRELOADED).start()
+        self.scores = None
+        self.high_scores = []
+        self.startup_timing = startup_timing  # Report the startup times and quit
+        self.first_frame_ms = None
+        self.leaderboard = None  # Shared with other cabinets when an address is given
+        if leaderboard_address:
+            self.leaderboard = leaderboard.connect(
+                leaderboard_address, on_update=lambda: pygame.event.post(pygame.event.Event(LEADERBOARD_UPDATED)))
         self.player_name = ""
-        self.entering_name = False
-        self.crosshair_pos = [WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2]  # Add this line
-        self.lives = 3
-        self.invincible = False
-        self.invincible_timer = 0
-        self.invincible_duration = 2000  # 2 seconds of invincibility after hit
-        self.body_segments = []  # Store bee body segment positions
-        self.hurt_effect_start = 0
-        self.hurt_effect_duration = 500  # 500ms
-        self.screen_shake_amount = 20
-        self.hurt_flash = False
+        self.cursor_visible = True
 
-    def get_player_name(self):
-        input_text = ""
-        input_active = True
-        
-        while input_active:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN and input_text.strip():
-                        return input_text
-                    elif event.key == pygame.K_BACKSPACE:
-                        input_text = input_text[:-1]
-                    else:
-                        if len(input_text) < 10:  # Limit name length
-                            input_text += event.unicode
-            
-            self.screen.fill(BACKGROUND_COLOR)
-            name_prompt = self.font.render("Enter your name:", True, WHITE)
-            name_text = self.font.render(input_text + "_", True, WHITE)
-            
-            self.screen.blit(name_prompt, (WINDOW_WIDTH/2 - 100, WINDOW_HEIGHT/2 - 50))
-            self.screen.blit(name_text, (WINDOW_WIDTH/2 - 80, WINDOW_HEIGHT/2))
-            
-            pygame.display.flip()
-            self.clock.tick(FPS)
+    def finish_loading(self):
+        """Take over what the preloader loaded, waiting for it if it isn't done yet"""
+        if self.scores is not None:
+            return
+        results = self.preloader.wait()
+        self.scores = results['scores']
+        self.high_scores = self.load_high_scores()
 
-    def load_high_scores(self):
-        try:
-            with open('high_scores.txt', 'r') as f:
-                scores = []
-                for line in f:
-                    name, score = line.strip().split(',')
-                    scores.append((name, int(score)))
-                return sorted(scores, key=lambda x: x[1], reverse=True)[:5]
-        except FileNotFoundError:
-            return []
-
-    def save_high_scores(self):
-        with open('high_scores.txt', 'w') as f:
-            for name, score in self.high_scores:
-                f.write(f"{name},{score}\n")
-
-    def update_high_scores(self):
-        player_name = self.get_player_name()
-        self.high_scores.append((player_name, self.score))
-        self.high_scores.sort(key=lambda x: x[1], reverse=True)
-        self.high_scores = self.high_scores[:5]  # Keep only top 5
-        self.save_high_scores()
+    def report_startup(self):
+        interactive_ms = (time.perf_counter() - STARTED_AT) * 1000
+        jobs = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.preloader.timings_ms.items())
+        imports_ms = (IMPORTED_AT - STARTED_AT) * 1000
+        print(f"Startup: first frame {self.first_frame_ms:.0f} ms, interactive {interactive_ms:.0f} ms "
+              f"(imports {imports_ms:.0f} ms; loaded in the background: {jobs})")
+        self.quit()
 
-    def show_high_scores(self):
+    def show_name_entry(self):
         self.screen.fill(BACKGROUND_COLOR)
+        name_prompt, _ = self.text.render("Enter your name:", 36, WHITE)
+        name_text, _ = self.text.render(self.player_name + ("_" if self.cursor_visible else ""), 36, WHITE)
 
-        # Load and scale background image while maintaining aspect ratio
-        try:
-            background = pygame.image.load('bubblebee.png')
-            bg_ratio = background.get_width() / background.get_height()
-            
-            # Calculate new dimensions that maintain aspect ratio and fill screen
-            if WINDOW_WIDTH/WINDOW_HEIGHT > bg_ratio:
-                new_width = WINDOW_WIDTH
-                new_height = int(WINDOW_WIDTH / bg_ratio)
-            else:
-                new_height = WINDOW_HEIGHT
-                new_width = int(WINDOW_HEIGHT * bg_ratio)
-                
-            background = pygame.transform.scale(background, (new_width, new_height))
-            
-            # Center the image
-            x = (WINDOW_WIDTH - new_width) // 2
-            y = (WINDOW_HEIGHT - new_height) // 2
-            self.screen.blit(background, (x, y))
-        except pygame.error:
-            print("Warning: Could not load bubblebee.png")
-            self.screen.fill(BACKGROUND_COLOR)
+        self.screen.blit(name_prompt, (WINDOW_WIDTH/2 - 100, WINDOW_HEIGHT/2 - 50))
+        self.screen.blit(name_text, (WINDOW_WIDTH/2 - 80, WINDOW_HEIGHT/2))
+
+        pygame.display.flip()
+
+    def load_high_scores(self):
+        # The shared leaderboard while its server is reachable, otherwise the local scores
+        if self.leaderboard is not None:
+            shared = self.leaderboard.top(5)
+            if shared is not None and self.leaderboard.online:
+                return shared
+        return self.scores.top(5)
+
+    def update_high_scores(self, player_name):
+        # Every game is kept; the table shows the top 5
+        self.scores.add(player_name, self.sim.score, self.sim.seed)
+        if self.leaderboard is not None:
+            self.leaderboard.submit(player_name, self.sim.score, self.sim.seed)
+        self.high_scores = self.load_high_scores()
+
+    def show_high_scores(self):
+        self.draw_title_background()
         
         title_text = "High Scores"
         title_pos = (50, 250)
@@ -187,20 +167,22 @@ class Game:
         pygame.display.flip()
 
     def draw_outlined_text(self, text, color, outline_color, position):
-        # Create the outline by drawing the text multiple times offset by 2 pixels
-        outline_positions = [(x, y) for x in (-2, 2) for y in (-2, 2)]
-        text_surface = self.font.render(text, True, outline_color)
-        
-        for dx, dy in outline_positions:
-            x, y = position[0] + dx, position[1] + dy
-            self.screen.blit(text_surface, (x, y))
-        
-        # Draw the main text on top
-        text_surface = self.font.render(text, True, color)
-        self.screen.blit(text_surface, position)
+        # The cached surface already has the outline drawn around the text, offset by 2 pixels
+        text_surface, (dx, dy) = self.text.render(text, 36, color, outline_color)
+        return self.screen.blit(text_surface, (position[0] + dx, position[1] + dy))
+
+    def draw_title_background(self):
+        self.screen.fill(BACKGROUND_COLOR)
+
+        # The title image is decoded and scaled once by the preloader, then reused from the
+        # asset cache; until then the screen stays plain sky
+        if self.preloader.done:
+            background = self.assets.cover(TITLE_IMAGE, (WINDOW_WIDTH, WINDOW_HEIGHT))
+            if background is not None:
+                self.screen.blit(*background)
 
     def draw_text_with_frame(self, text, position, frame_padding=20):
-        text_surface = self.font.render(text, True, WHITE)
+        text_surface, _ = self.text.render(text, 36, WHITE)
         text_rect = text_surface.get_rect(topleft=position)
         
         # Draw semi-transparent background frame
@@ -213,551 +195,451 @@ class Game:
         self.screen.blit(text_surface, position)
 
     def show_start_screen(self):
-        self.screen.fill(BACKGROUND_COLOR)
+        self.draw_title_background()
         
-        # Load and scale background image while maintaining aspect ratio
-        try:
-            background = pygame.image.load('bubblebee.png')
-            bg_ratio = background.get_width() / background.get_height()
-            
-            # Calculate new dimensions that maintain aspect ratio and fill screen
-            if WINDOW_WIDTH/WINDOW_HEIGHT > bg_ratio:
-                new_width = WINDOW_WIDTH
-                new_height = int(WINDOW_WIDTH / bg_ratio)
-            else:
-                new_height = WINDOW_HEIGHT
-                new_width = int(WINDOW_HEIGHT * bg_ratio)
-                
-            background = pygame.transform.scale(background, (new_width, new_height))
-            
-            # Center the image
-            x = (WINDOW_WIDTH - new_width) // 2
-            y = (WINDOW_HEIGHT - new_height) // 2
-            self.screen.blit(background, (x, y))
-        except pygame.error:
-            print("Warning: Could not load bubblebee.png")
-            self.screen.fill(BACKGROUND_COLOR)
-        
-        font = pygame.font.Font(None, 36)
-        start_text = font.render("Press any key to start", True, BLACK)
+        start_text, _ = self.text.render("Press any key to start", 36, BLACK)
         text_rect = start_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 + 50))
         self.screen.blit(start_text, text_rect)
         
         pygame.display.flip()
-        
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    waiting = False
+        if self.first_frame_ms is None:
+            self.first_frame_ms = (time.perf_counter() - STARTED_AT) * 1000
+        elif self.startup_timing and self.scores is not None:
+            self.report_startup()  # The full start screen is up and ready to play
+
+    def run_menu(self):
+        """Show the current menu screen until the state changes.
+
+        Blocks in pygame.event.wait(), so an idle menu uses no CPU, and only redraws
+        after input or when the name entry cursor blinks.
+        """
+        state = self.state
+        redraw = True
+        while self.state == state:
+            if redraw:
+                if state == START:
+                    self.show_start_screen()
+                elif state == NAME_ENTRY:
+                    self.show_name_entry()
+                else:
+                    self.show_high_scores()
+
+            event = pygame.event.wait(MENU_TIMEOUT_MS)
+            if event.type == pygame.NOEVENT:
+                self.cursor_visible = not self.cursor_visible
+                redraw = state == NAME_ENTRY
+            else:
+                redraw = self.handle_menu_event(event)
+
+    def handle_menu_event(self, event):
+        """React to input on a menu screen; returns whether the screen needs redrawing"""
+        if event.type == pygame.QUIT:
+            self.quit()
+        if event.type == PRELOADED:
+            self.finish_loading()
+            return self.state == START
+        if event.type == LEADERBOARD_UPDATED and self.scores is not None:
+            self.high_scores = self.load_high_scores()
+            return self.state == HIGH_SCORES
+        if event.type != pygame.KEYDOWN:
+            return False
+
+        if self.state == START:
+            self.state = PLAYING
+        elif self.state == NAME_ENTRY:
+            if event.key == pygame.K_RETURN and self.player_name.strip():
+                self.update_high_scores(self.player_name)
+                self.player_name = ""
+                self.state = HIGH_SCORES
+            elif event.key == pygame.K_BACKSPACE:
+                self.player_name = self.player_name[:-1]
+            elif len(self.player_name) < 10:  # Limit name length
+                self.player_name += event.unicode
+            self.cursor_visible = True
+            return True
+        elif event.key == pygame.K_r:
+            self.reset_game()
+            self.state = PLAYING
+        elif event.key == pygame.K_q:
+            self.quit()
+        return False
+
+    def quit(self):
+        if self.recorder:
+            self.recorder.close()
+        if self.scores is not None:
+            self.scores.close()
+        if self.leaderboard is not None:
+            self.leaderboard.close()
+        if self.profile_path:
+            self.profiler.export(self.profile_path)
+        pygame.quit()
+        sys.exit()
 
     def reset_game(self):
-        self.score = 0
-        self.game_over = False
-        self.bubbles = []
-        self.last_bubble_spawn = 0
-        self.player_pos = [WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2]
-        self.player_angle = 0
-        self.spawn_level = 1
-        self.warning_time = 0
-        self.showing_warning = False
-        self.bubble_spawn_delay = 1000
-        self.clouds = [Cloud() for _ in range(5)]
-        self.bullets = []
-        self.last_shot_time = 0
-        self.lives = 3
-        self.invincible = False
-        self.invincible_timer = 0
-
-    def spawn_bubble(self):
-        side = random.choice(['top', 'right', 'bottom', 'left'])
-        radius = random.choices([random.randint(10, 40), random.randint(81, 100), random.randint(200, 250)], [0.8, 0.15, 0.05])[0]
-        base_speed = 2.0  # Base speed for the smallest bubble
-        speed = base_speed * (10 / radius)  # Adjust speed based on radius
-        if side == 'top':
-            x = random.randint(0, WINDOW_WIDTH)
-            y = -radius * 2
-            dy = speed
-            dx = random.uniform(-speed, speed)
-        elif side == 'right':
-            x = WINDOW_WIDTH + radius * 2
-            y = random.randint(0, WINDOW_HEIGHT)
-            dx = -speed
-            dy = random.uniform(-speed, speed)
-        elif side == 'bottom':
-            x = random.randint(0, WINDOW_WIDTH)
-            y = WINDOW_HEIGHT + radius * 2
-            dy = -speed
-            dx = random.uniform(-speed, speed)
-        else:  # left
-            x = -radius * 2
-            y = random.randint(0, WINDOW_HEIGHT)
-            dx = speed
-            dy = random.uniform(-speed, speed)
-        
-        # Ensure the new bubble does not spawn inside another bubble
-        for bubble in self.bubbles:
-            if math.hypot(x - bubble['x'], y - bubble['y']) < radius + bubble['radius']:
-                return  # Do not spawn this bubble
-
-        # Add color and shine properties
-        color = random.choice(BUBBLE_COLORS)
-        shine_offset = random.randint(-radius//2, -radius//4)  # Position of shine relative to center
-
-        self.bubbles.append({
-            'x': x, 'y': y, 'dx': dx, 'dy': dy, 'radius': radius, 'angle': 0,
-            'color': color, 'shine_offset': shine_offset
-        })
-
-    def enforce_minimum_speed(self, bubble):
-        original_speed = 6.0 * (10 / bubble['radius'])  # Same calculation as in spawn_bubble
-        min_speed = original_speed * MIN_SPEED_FACTOR
-        current_speed = math.hypot(bubble['dx'], bubble['dy'])
-        
-        if current_speed < min_speed:
-            speed_factor = min_speed / current_speed
-            bubble['dx'] *= speed_factor
-            bubble['dy'] *= speed_factor
+        if self.swarm_config is not None:
+            self.sim = SwarmSimulation(self.swarm_config)
+        else:
+            self.sim = Simulation(continuous=self.continuous)
+        self.sim.profiler = self.active_profiler()
+        self.needs_full_redraw = True
+        self.games_played += 1
+        if self.record_path:
+            # Each game gets its own recording: run.bbr, run-2.bbr, ...
+            path = self.record_path
+            if self.games_played > 1:
+                base, ext = os.path.splitext(path)
+                path = f"{base}-{self.games_played}{ext}"
+            self.recorder = ReplayRecorder(path, self.sim.seed, self.sim.continuous)
+        self.screen_shake_amount = 20
+        self.hurt_flash = False
 
     def show_warning(self):
-        font = pygame.font.Font(None, 48)
-        warning_text = font.render(f"Yay! More bubbles Incoming! ^_^", True, WHITE)
+        warning_text, _ = self.text.render("Yay! More bubbles Incoming! ^_^", 48, WHITE)
         text_rect = warning_text.get_rect(center=(WINDOW_WIDTH/2, 50))
-        self.screen.blit(warning_text, text_rect)
-
-    def shoot(self, current_time):
-        if current_time - self.last_shot_time > self.shot_delay:
-            direction = math.radians(self.player_angle)
-            dx = math.cos(direction) * self.bullet_speed
-            dy = -math.sin(direction) * self.bullet_speed
-            
-            bullet_x = self.player_pos[0] + 20 * math.cos(direction)
-            bullet_y = self.player_pos[1] - 20 * math.sin(direction)
-            
-            self.bullets.append({
-                'x': bullet_x,
-                'y': bullet_y,
-                'dx': dx,
-                'dy': dy,
-                'rotation': math.degrees(direction)  # Add rotation to track angle
-            })
-            self.last_shot_time = current_time
-
-    def split_bubble(self, bubble):
-        if bubble['radius'] <= self.min_bubble_radius:
-            return []
-        
-        new_radius = bubble['radius'] / 2
-        speed_increase = 1.5
-        
-        # Create two smaller bubbles
-        bubble1 = {
-            'x': bubble['x'],
-            'y': bubble['y'],
-            'dx': bubble['dx'] * speed_increase,
-            'dy': bubble['dy'] * speed_increase,
-            'radius': new_radius,
-            'angle': 0,
-            'color': bubble['color'],
-            'shine_offset': random.randint(-int(new_radius//2), -int(new_radius//4))
-        }
-        
-        bubble2 = {
-            'x': bubble['x'],
-            'y': bubble['y'],
-            'dx': -bubble['dx'] * speed_increase,
-            'dy': -bubble['dy'] * speed_increase,
-            'radius': new_radius,
-            'angle': 0,
-            'color': bubble['color'],
-            'shine_offset': random.randint(-int(new_radius//2), -int(new_radius//4))
-        }
-        
-        return [bubble1, bubble2] if new_radius > self.min_bubble_radius else []
-
-    def separate_bubbles(self, bubble1, bubble2):
-        dx = bubble2['x'] - bubble1['x']
-        dy = bubble2['y'] - bubble1['y']
-        distance = math.hypot(dx, dy)
-        
-        if distance == 0:  # Handle edge case of exact overlap
-            bubble2['x'] += 1
-            return
-            
-        # Calculate minimum separation distance
-        min_distance = bubble1['radius'] + bubble2['radius']
-        
-        if distance < min_distance:
-            # Calculate overlap
-            overlap = (min_distance - distance) / 2
-            
-            # Normalize direction vector
-            dx /= distance
-            dy /= distance
-            
-            # Move bubbles apart
-            bubble1['x'] -= dx * overlap
-            bubble1['y'] -= dy * overlap
-            bubble2['x'] += dx * overlap
-            bubble2['y'] += dy * overlap
-
-    def get_bee_hitbox(self):
-        """Get the hitbox points for the bee's body segments"""
-        bee_direction = math.radians(self.player_angle)
-        hitbox_points = []
-        
-        # Get points for each body segment
-        for i in range(3):  # 3 body segments
-            offset = i * 8 - 8  # Spacing between segments
-            x = self.player_pos[0] + offset * math.cos(bee_direction)
-            y = self.player_pos[1] - offset * math.sin(bee_direction)
-            hitbox_points.append((x, y))
-            
-        return hitbox_points
-
-    def check_collision_with_bubble(self, bubble):
-        """More precise collision detection using body segments"""
-        hitbox_points = self.get_bee_hitbox()
-        bubble_center = (bubble['x'], bubble['y'])
-        segment_radius = 10  # Radius of body segments
-        
-        # Check each body segment for collision
-        for point in hitbox_points:
-            distance = math.hypot(point[0] - bubble_center[0], 
-                                point[1] - bubble_center[1])
-            if distance < (segment_radius + bubble['radius']):
-                return True
-        return False
-
-    def apply_screen_shake(self, surface):
-        if pygame.time.get_ticks() - self.hurt_effect_start < self.hurt_effect_duration:
-            offset_x = random.randint(-self.screen_shake_amount, self.screen_shake_amount)
-            offset_y = random.randint(-self.screen_shake_amount, self.screen_shake_amount)
-            
-            # Create a red overlay for the hurt effect
-            if self.hurt_flash:
-                overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-                overlay.fill((255, 0, 0))  # Red
-                overlay.set_alpha(100)  # Semi-transparent
-                surface.blit(overlay, (0, 0))
-            
-            # Apply shake effect
-            shifted_surface = surface.copy()
-            shifted_rect = shifted_surface.get_rect(center=(WINDOW_WIDTH//2 + offset_x, WINDOW_HEIGHT//2 + offset_y))
-            return shifted_surface, shifted_rect
-        return surface, surface.get_rect()
+        return self.screen.blit(warning_text, text_rect)
+
+    def draw_clouds(self, alpha):
+        cloud_blits = []
+        clouds = self.sim.clouds
+        for cloud in clouds[:self.quality.cloud_count(clouds)]:
+            sprite, offset_x, offset_y = self.cloud_layer.get(cloud)
+            cloud_x = cloud.prev_x + (cloud.x - cloud.prev_x) * alpha
+            cloud_blits.append((sprite, (int(cloud_x) + offset_x, int(cloud.y) + offset_y)))
+        return self.screen.blits(cloud_blits)
+
+    def update_hurt_effect(self):
+        # Shake and flash follow simulation time, so they look the same at any frame rate
+        steps = int((self.sim.time_ms - self.sim.hurt_effect_start) / STEP_MS) + 1
+        # Decrease shake amount over time
+        self.screen_shake_amount = max(0, 20 - steps)
+        # Toggle hurt flash
+        self.hurt_flash = steps % 2 == 0
+
+    def apply_screen_shake(self):
+        """Flash the finished frame red and shift it by a random offset, in place.
+
+        The picture is moved with a scroll of the screen itself and the strips it
+        uncovers are filled with the sky colour, so no surface gets allocated or copied.
+        """
+        offset_x = random.randint(-self.screen_shake_amount, self.screen_shake_amount)
+        offset_y = random.randint(-self.screen_shake_amount, self.screen_shake_amount)
+
+        # Red overlay for the hurt effect
+        if self.hurt_flash:
+            self.screen.blit(self.flash_overlay, (0, 0))
+
+        # Apply shake effect
+        self.screen.scroll(offset_x, offset_y)
+        if offset_x > 0:
+            self.screen.fill(BACKGROUND_COLOR, (0, 0, offset_x, WINDOW_HEIGHT))
+        elif offset_x < 0:
+            self.screen.fill(BACKGROUND_COLOR, (WINDOW_WIDTH + offset_x, 0, -offset_x, WINDOW_HEIGHT))
+        if offset_y > 0:
+            self.screen.fill(BACKGROUND_COLOR, (0, 0, WINDOW_WIDTH, offset_y))
+        elif offset_y < 0:
+            self.screen.fill(BACKGROUND_COLOR, (0, WINDOW_HEIGHT + offset_y, WINDOW_WIDTH, -offset_y))
 
     def run(self):
-        last_score_update = pygame.time.get_ticks()
-        showing_high_scores = False
+        accumulator = 0.0
         while True:
-            current_time = pygame.time.get_ticks()
-            delta_time = (current_time - last_score_update) / 1000.0  # Convert milliseconds to seconds
+            if self.state != PLAYING:
+                self.run_menu()
+                self.finish_loading()  # A key pressed before loading finished waits for it here
+                # Start the game clock afresh, so the time spent in the menu isn't played
+                accumulator = 0.0
+                self.needs_full_redraw = True
+                self.clock.tick()
+                continue
+
+            # Time since the last frame, capped so we never queue more steps than we can catch up on
+            frame_ms = min(self.clock.tick(self.fps), STEP_MS * MAX_STEPS_PER_FRAME)
+            if self.sim.profiler is not None:
+                self.sim.profiler.begin_frame()  # Time spent waiting in tick() doesn't count
+            if self.adaptive_quality:
+                self.quality.update(self.clock.get_rawtime())
             
             # Event handling
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r and (self.game_over or showing_high_scores):
-                        showing_high_scores = False
-                        self.reset_game()
-                    elif event.key == pygame.K_q and showing_high_scores:
-                        pygame.quit()
-                        sys.exit()
-
-            if self.game_over and not showing_high_scores:
-                self.update_high_scores()
-                showing_high_scores = True
-                self.show_high_scores()
-                continue
-            
-            if showing_high_scores:
-                self.show_high_scores()
+                    if event.key == pygame.K_F3:
+                        self.show_profiler = not self.show_profiler
+                        self.sim.profiler = self.active_profiler()
+                        if self.sim.profiler is not None:
+                            self.sim.profiler.begin_frame()  # Don't count the frames it wasn't attached for
+                        self.needs_full_redraw = True
+
+            if self.sim.game_over:
+                if self.recorder:
+                    self.recorder.close(self.sim)
+                # Swarm scores aren't comparable with normal games, so they aren't kept
+                self.state = NAME_ENTRY if self.swarm_config is None else HIGH_SCORES
                 continue
 
-            # Update crosshair position to follow mouse directly
+            # Feed the mouse into the simulation, one fixed step at a time
             mouse_x, mouse_y = pygame.mouse.get_pos()
-            self.crosshair_pos = [mouse_x, mouse_y]
-
-            # Calculate player movement direction towards crosshair with delay
-            dx = self.crosshair_pos[0] - self.player_pos[0]
-            dy = self.crosshair_pos[1] - self.player_pos[1]
-            distance = math.hypot(dx, dy)
-            
-            # Keep player at a minimum distance from crosshair
-            min_distance = 60
-            if distance > min_distance:
-                # Move player towards crosshair but stay behind it
-                target_x = self.crosshair_pos[0] - (dx/distance * min_distance)
-                target_y = self.crosshair_pos[1] - (dy/distance * min_distance)
-                
-                # Smooth movement towards target position with speed control
-                self.player_pos[0] += (target_x - self.player_pos[0]) * PLAYER_SPEED
-                self.player_pos[1] += (target_y - self.player_pos[1]) * PLAYER_SPEED
-
-            # Update player angle to face crosshair
-            if distance > 0:
-                self.player_angle = math.degrees(math.atan2(-dy, dx))
-
-            # Handle shooting
             mouse_buttons = pygame.mouse.get_pressed()
-            if mouse_buttons[0]:  # Left mouse button
-                self.shoot(current_time)
-
-            if not self.game_over:
-                current_level = (self.score // 10) + 1
-                
-                # Check if we need to increase spawn rate
-                if current_level > self.spawn_level:
-                    self.spawn_level = current_level
-                    self.bubble_spawn_delay *= 0.8  # Decrease spawn delay by 20%
-                    print(f"Level up! Current level: {self.bubble_spawn_delay}")
-                    self.warning_time = current_time
-                    self.showing_warning = True
-
-                # Spawn new bubbles
-                if current_time - self.last_bubble_spawn > self.bubble_spawn_delay:
-                    self.spawn_bubble()
-                    self.last_bubble_spawn = current_time
-
-                # Update bubble positions and rotation
-                for bubble in self.bubbles[:]:
-                    bubble['x'] += bubble['dx']
-                    bubble['y'] += bubble['dy']
-                    bubble['angle'] += 1  # Rotate the bubble slowly
-                    
-                    # Remove bubbles that are off screen
-                    if (bubble['x'] < -bubble['radius'] * 2 or bubble['x'] > WINDOW_WIDTH + bubble['radius'] * 2 or
-                        bubble['y'] < -bubble['radius'] * 2 or bubble['y'] > WINDOW_HEIGHT + bubble['radius'] * 2):
-                        self.bubbles.remove(bubble)
-
-                    # Replace the old collision check with the new precise one
-                    if not self.invincible:
-                        if self.check_collision_with_bubble(bubble):
-                            self.lives -= 1
-                            if self.lives <= 0:
-                                self.game_over = True
-                            else:
-                                self.invincible = True
-                                self.invincible_timer = current_time
-                                self.hurt_effect_start = current_time
-                                self.hurt_flash = True
-                                # Reset screen shake
-                                self.screen_shake_amount = 20
-
-                # Handle invincibility
-                if self.invincible:
-                    if current_time - self.invincible_timer > self.invincible_duration:
-                        self.invincible = False
-
-                # Check collisions between bubbles
-                for i, bubble1 in enumerate(self.bubbles):
-                    for j, bubble2 in enumerate(self.bubbles):
-                        if i >= j:
-                            continue
-                        
-                        distance = math.hypot(bubble1['x'] - bubble2['x'], 
-                                           bubble1['y'] - bubble2['y'])
-                        
-                        if distance < bubble1['radius'] + bubble2['radius']:
-                            # First separate overlapping bubbles
-                            self.separate_bubbles(bubble1, bubble2)
-                            
-                            # Calculate masses based on radius
-                            m1 = bubble1['radius'] ** 2
-                            m2 = bubble2['radius'] ** 2
-                            
-                            # Calculate new velocities using conservation of momentum
-                            total_mass = m1 + m2
-                            new_dx1 = (m1 - m2) / total_mass * bubble1['dx'] + (2 * m2) / total_mass * bubble2['dx']
-                            new_dy1 = (m1 - m2) / total_mass * bubble1['dy'] + (2 * m2) / total_mass * bubble2['dy']
-                            new_dx2 = (2 * m1) / total_mass * bubble1['dx'] + (m2 - m1) / total_mass * bubble2['dx']
-                            new_dy2 = (2 * m1) / total_mass * bubble1['dy'] + (m2 - m1) / total_mass * bubble2['dy']
-                            
-                            # Apply new velocities
-                            bubble1['dx'], bubble2['dx'] = new_dx1, new_dx2
-                            bubble1['dy'], bubble2['dy'] = new_dy1, new_dy2
-                            
-                            # Enforce minimum speeds after collision
-                            self.enforce_minimum_speed(bubble1)
-                            self.enforce_minimum_speed(bubble2)
-
-                # Update bullet positions and check collisions
-                for bullet in self.bullets[:]:
-                    bullet['x'] += bullet['dx']
-                    bullet['y'] += bullet['dy']
-                    
-                    # Remove bullets that are off screen
-                    if (bullet['x'] < 0 or bullet['x'] > WINDOW_WIDTH or
-                        bullet['y'] < 0 or bullet['y'] > WINDOW_HEIGHT):
-                        self.bullets.remove(bullet)
-                        continue
-                    
-                    # Check bullet collisions with bubbles
-                    for bubble in self.bubbles[:]:
-                        if math.hypot(bullet['x'] - bubble['x'], 
-                                    bullet['y'] - bubble['y']) < bubble['radius']:
-                            if bubble in self.bubbles:  # Check if bubble still exists
-                                self.bubbles.remove(bubble)
-                                self.bubbles.extend(self.split_bubble(bubble))
-                                if bullet in self.bullets:  # Check if bullet still exists
-                                    self.bullets.remove(bullet)
-                                self.score += 1
-                                break
-
-                # Increase score by 1 point per real-time second
-                if delta_time >= 1:
-                    self.score += 1
-                    last_score_update = current_time
-
-            # Drawing
-            self.screen.fill(BACKGROUND_COLOR)
+            inputs = Inputs(mouse_x, mouse_y, mouse_buttons[0])
+            buttons = mouse_buttons[0] | mouse_buttons[1] << 1 | mouse_buttons[2] << 2
+            profiler = self.sim.profiler
+            if profiler is not None:
+                profiler.lap(INPUT)
+
+            accumulator += frame_ms
+            while accumulator >= STEP_MS:
+                self.sim.step(inputs)
+                accumulator -= STEP_MS
+                if self.recorder:
+                    self.recorder.record(mouse_x, mouse_y, buttons)
+
+            if self.sim.hurt_active():
+                self.update_hurt_effect()
+
+            # Draw between the last two physics states
+            self.draw(accumulator / STEP_MS)
+            if self.show_profiler:
+                self.frame_rects.append(self.draw_profiler())
+            if profiler is not None:
+                profiler.lap(DRAW)
+            self.present()
+            if profiler is not None:
+                profiler.lap(FLIP)
+                profiler.end_frame(len(self.sim.bubbles), len(self.sim.bullets))
+
+    def active_profiler(self):
+        """The profiler while frames are being timed, otherwise None"""
+        return self.profiler if self.show_profiler or self.profile_path else None
+
+    def draw_profiler(self):
+        """Frame time graph, percentiles and entity counts in the bottom left corner"""
+        panel = self.profiler_panel
+        width, height = PROFILER_PANEL_SIZE
+        graph_height = height - 60
+        panel.fill((0, 0, 0, 160))
+
+        # One bar per recent frame, scaled so the 60 FPS budget sits halfway up
+        frame_ms = self.profiler.frame_times_ms()[-width:]
+        budget_y = graph_height - graph_height // 2
+        for x, ms in enumerate(frame_ms.tolist()):
+            bar = min(graph_height, int(ms * graph_height / (2 * STEP_MS)))
+            color = GREEN if ms <= STEP_MS else RED
+            panel.fill(color, (x, graph_height - bar, 1, bar))
+        pygame.draw.line(panel, WHITE, (0, budget_y), (width, budget_y))
+
+        summary = self.profiler.summary()
+        if summary:
+            stages = summary['stages_ms']
+            lines = [
+                f"p50 {summary['p50_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms  "
+                f"spawns retried {self.sim.spawn_rejections}  lost {self.sim.spawn_failures}",
+                "  ".join(f"{stage} {stages[stage]:.1f}" for stage in STAGES[1:5]),
+                f"draw {stages['draw']:.1f}  flip {stages['flip']:.1f}  "
+                f"bubbles {len(self.sim.bubbles)}  bullets {len(self.sim.bullets)}  "
+                f"quality -{self.quality.level}",
+            ]
+            for i, line in enumerate(lines):
+                text, _ = self.text.render(line, 20, WHITE)
+                panel.blit(text, (4, graph_height + 4 + i * 18))
+
+        return self.screen.blit(panel, (0, WINDOW_HEIGHT - height))
+
+    def present(self):
+        """Push the frame to the display, only the changed areas when dirty rects are on"""
+        if self.full_frame:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.last_rects + self.frame_rects)
+        self.last_rects = self.frame_rects
+        # The frame after a shake has to be redrawn in full to get rid of the shifted picture
+        self.needs_full_redraw = self.sim.hurt_active()
+
+    def draw(self, alpha=1.0):
+        sim = self.sim
+        rects = self.frame_rects = []
+
+        # Screen shake moves the whole picture, so it always needs a full redraw and flip
+        shaking = sim.hurt_active() and self.quality.screen_shake
+        self.full_frame = not self.dirty_rects or self.needs_full_redraw or shaking
+        background = self.cloud_layer.background
+        if self.full_frame:
+            self.screen.blit(background, (0, 0))
+        else:
+            # Erase only what was drawn last frame
+            for rect in self.last_rects:
+                self.screen.blit(background, rect, rect)
+        
+        # Draw clouds
+        rects.extend(self.draw_clouds(alpha))
             
-            # Update and draw clouds
-            for cloud in self.clouds:
-                cloud.move()
-                cloud.draw(self.screen)
-                
-            # Show warning message for 2 seconds
-            if self.showing_warning and current_time - self.warning_time < 2000:
-                self.show_warning()
+        # Show warning message for 2 seconds
+        if sim.showing_warning:
+            rects.append(self.show_warning())
+
+        # Draw bubbles, one cached sprite each, in a single batch
+        bubbles = sim.bubbles
+        n = bubbles.count
+        bubble_xs, bubble_ys = bubbles.interpolated(alpha)
+        sprite_blits = self.bubble_sprites.blits(bubble_xs, bubble_ys, bubbles.radius[:n], bubbles.color[:n],
+                                                 bubbles.shine_offset[:n], self.quality.bubble_details)
+        if self.dirty_rects:
+            rects.extend(self.screen.blits(sprite_blits))
+        else:
+            self.screen.blits(sprite_blits, doreturn=False)
+
+        # Draw bullets as stingers
+        if self.stinger_sprites is not None:
+            bullets = sim.bullets
+            n = bullets.count
+            prev_x, prev_y = bullets.prev_x[:n], bullets.prev_y[:n]
+            stinger_blits = self.stinger_sprites.blits(prev_x + (bullets.x[:n] - prev_x) * alpha,
+                                                       prev_y + (bullets.y[:n] - prev_y) * alpha,
+                                                       bullets.rotation[:n])
+            if self.dirty_rects:
+                rects.extend(self.screen.blits(stinger_blits))
             else:
-                self.showing_warning = False
-
-            # Draw bubbles
-            for bubble in self.bubbles:
-                # Draw main bubble
-                pygame.draw.circle(self.screen, bubble['color'], 
-                                 (int(bubble['x']), int(bubble['y'])), 
-                                 bubble['radius'])
-                # Draw outline
-                pygame.draw.circle(self.screen, WHITE, 
-                                 (int(bubble['x']), int(bubble['y'])), 
-                                 bubble['radius'], 1)
-                # Draw shine (smaller white circle)
-                shine_x = int(bubble['x'] + bubble['shine_offset'])
-                shine_y = int(bubble['y'] + bubble['shine_offset'])
-                shine_radius = max(3, bubble['radius'] // 4)
-                pygame.draw.circle(self.screen, WHITE, 
-                                 (shine_x, shine_y), 
-                                 shine_radius)
-
-            # Draw bullets as stingers
-            for bullet in self.bullets:
+                self.screen.blits(stinger_blits, doreturn=False)
+        else:
+            detailed_stingers = self.quality.detailed_stingers
+            for bullet in sim.bullets:
+                bullet_x = bullet.prev_x + (bullet.x - bullet.prev_x) * alpha
+                bullet_y = bullet.prev_y + (bullet.y - bullet.prev_y) * alpha
+                if not detailed_stingers:
+                    # Just a short line towards where it is going
+                    rects.append(pygame.draw.line(self.screen, BLACK, (bullet_x, bullet_y),
+                                                  (bullet_x + bullet.dx * 0.8, bullet_y + bullet.dy * 0.8), 3))
+                    continue
+
                 # Calculate the three points of the triangle
-                angle = math.radians(bullet['rotation'])
+                angle = math.radians(bullet.rotation)
                 length = 8  # Length of the stinger
                 width = 3   # Half width of the stinger base
-                
+            
                 # Tip of the stinger
-                tip_x = bullet['x'] + length * math.cos(angle)
-                tip_y = bullet['y'] - length * math.sin(angle)
-                
+                tip_x = bullet_x + length * math.cos(angle)
+                tip_y = bullet_y - length * math.sin(angle)
+            
                 # Base points of the stinger
                 base_angle1 = angle + math.pi/2
                 base_angle2 = angle - math.pi/2
-                base1_x = bullet['x'] + width * math.cos(base_angle1)
-                base1_y = bullet['y'] - width * math.sin(base_angle1)
-                base2_x = bullet['x'] + width * math.cos(base_angle2)
-                base2_y = bullet['y'] - width * math.sin(base_angle2)
-                
+                base1_x = bullet_x + width * math.cos(base_angle1)
+                base1_y = bullet_y - width * math.sin(base_angle1)
+                base2_x = bullet_x + width * math.cos(base_angle2)
+                base2_y = bullet_y - width * math.sin(base_angle2)
+            
                 # Draw the stinger
-                pygame.draw.polygon(self.screen, BLACK, [
+                rects.append(pygame.draw.polygon(self.screen, BLACK, [
                     (tip_x, tip_y),
                     (base1_x, base1_y),
                     (base2_x, base2_y)
-                ])
-
-            # Draw player (bee)
-            # Calculate bee parts positions based on angle
-            bee_direction = math.radians(self.player_angle)
-            
-            # Body segments (yellow and black stripes)
-            body_colors = [YELLOW, BLACK, YELLOW]
-            for i, color in enumerate(body_colors):
-                offset = i * 8 - 8  # Spacing between segments
-                x = self.player_pos[0] + offset * math.cos(bee_direction)
-                y = self.player_pos[1] - offset * math.sin(bee_direction)
-                pygame.draw.circle(self.screen, color, (int(x), int(y)), 10)
-            
-            # Wings
-            wing_angle1 = bee_direction + math.pi/2  # Right wing
-            wing_angle2 = bee_direction - math.pi/2  # Left wing
-            for wing_angle in [wing_angle1, wing_angle2]:
-                wing_x = self.player_pos[0] + 5 * math.cos(bee_direction)
-                wing_y = self.player_pos[1] - 5 * math.sin(bee_direction)
-                wing_x += 12 * math.cos(wing_angle)
-                wing_y += 12 * math.sin(wing_angle)
-                pygame.draw.circle(self.screen, WHITE, (int(wing_x), int(wing_y)), 8)
-            
-            # Antennae
-            antenna_base_x = self.player_pos[0] + 10 * math.cos(bee_direction)
-            antenna_base_y = self.player_pos[1] - 10 * math.sin(bee_direction)
-            antenna_angle1 = bee_direction - math.pi/6
-            antenna_angle2 = bee_direction + math.pi/6
-            for antenna_angle in [antenna_angle1, antenna_angle2]:
-                end_x = antenna_base_x + 8 * math.cos(antenna_angle)
-                end_y = antenna_base_y - 8 * math.sin(antenna_angle)
-                pygame.draw.line(self.screen, BLACK, 
-                               (int(antenna_base_x), int(antenna_base_y)),
-                               (int(end_x), int(end_y)), 2)
-                pygame.draw.circle(self.screen, BLACK, (int(end_x), int(end_y)), 2)
-
-            # Draw crosshair
-            crosshair_size = 10
-            pygame.draw.line(self.screen, RED, 
-                           (self.crosshair_pos[0] - crosshair_size, self.crosshair_pos[1]),
-                           (self.crosshair_pos[0] + crosshair_size, self.crosshair_pos[1]), 2)
-            pygame.draw.line(self.screen, RED, 
-                           (self.crosshair_pos[0], self.crosshair_pos[1] - crosshair_size),
-                           (self.crosshair_pos[0], self.crosshair_pos[1] + crosshair_size), 2)
-
-            # Draw score with outline
-            font = pygame.font.Font(None, 48)  # Increased font size
-            self.draw_outlined_text(f"Score: {self.score}", BLACK, WHITE, (10, 10))
-
-            # Draw lives with outline
-            self.draw_outlined_text(f"Lives: {self.lives}", BLACK, WHITE, (WINDOW_WIDTH-120, 10))
-
-            # Draw invincibility effect
-            if self.invincible:
-                flash = (current_time // 200) % 2  # Flash every 200ms
-                if flash:
-                    pygame.draw.circle(self.screen, WHITE, 
-                                     (int(self.player_pos[0]), int(self.player_pos[1])), 
-                                     15, 2)  # Draw white circle around player
-
-            # Update game over screen drawing
-            if self.game_over:
-                font = pygame.font.Font(None, 36)
-                game_over_text = font.render(f"Game Over! Score: {self.score}", True, WHITE)
-                text_rect = game_over_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
-                self.screen.blit(game_over_text, text_rect)
-
-            # Apply hurt effect and screen shake
-            if pygame.time.get_ticks() - self.hurt_effect_start < self.hurt_effect_duration:
-                # Decrease shake amount over time
-                self.screen_shake_amount = max(0, self.screen_shake_amount - 1)
-                # Toggle hurt flash
-                self.hurt_flash = not self.hurt_flash
-                
-                # Apply the effects
-                shaken_screen, shaken_rect = self.apply_screen_shake(self.screen)
-                # Create a temporary surface to draw the shaken screen
-                temp_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-                temp_surface.fill(BACKGROUND_COLOR)
-                temp_surface.blit(shaken_screen, shaken_rect)
-                # Update the display with the shaken surface
-                self.screen.blit(temp_surface, (0, 0))
-
-            pygame.display.flip()
-            self.clock.tick(FPS)
+                ]))
+
+        # Draw player (bee)
+        player_x = sim.prev_player_pos[0] + (sim.player_pos[0] - sim.prev_player_pos[0]) * alpha
+        player_y = sim.prev_player_pos[1] + (sim.player_pos[1] - sim.prev_player_pos[1]) * alpha
+
+        # Bee parts positions based on angle
+        bee = self.bee_pose.update(player_x, player_y, sim.player_angle)
+
+        # Body segments (yellow and black stripes)
+        body_colors = [YELLOW, BLACK, YELLOW]
+        for color, (x, y) in zip(body_colors, bee.segments):
+            rects.append(pygame.draw.circle(self.screen, color, (int(x), int(y)), SEGMENT_RADIUS))
+
+        # Wings
+        for wing_x, wing_y in bee.wings:
+            rects.append(pygame.draw.circle(self.screen, WHITE, (int(wing_x), int(wing_y)), 8))
+
+        # Antennae
+        antenna_base_x, antenna_base_y = bee.antenna_base
+        for end_x, end_y in bee.antenna_tips:
+            rects.append(pygame.draw.line(self.screen, BLACK,
+                           (int(antenna_base_x), int(antenna_base_y)),
+                           (int(end_x), int(end_y)), 2))
+            rects.append(pygame.draw.circle(self.screen, BLACK, (int(end_x), int(end_y)), 2))
+
+        # Draw crosshair
+        crosshair_size = 10
+        rects.append(pygame.draw.line(self.screen, RED, 
+                       (sim.crosshair_pos[0] - crosshair_size, sim.crosshair_pos[1]),
+                       (sim.crosshair_pos[0] + crosshair_size, sim.crosshair_pos[1]), 2))
+        rects.append(pygame.draw.line(self.screen, RED, 
+                       (sim.crosshair_pos[0], sim.crosshair_pos[1] - crosshair_size),
+                       (sim.crosshair_pos[0], sim.crosshair_pos[1] + crosshair_size), 2))
+
+        # Draw score with outline
+        rects.append(self.draw_outlined_text(f"Score: {sim.score}", BLACK, WHITE, (10, 10)))
+
+        # Draw lives with outline
+        rects.append(self.draw_outlined_text(f"Lives: {sim.lives}", BLACK, WHITE, (WINDOW_WIDTH-120, 10)))
+
+        # Draw invincibility effect
+        if sim.invincible:
+            flash = (sim.time_ms // 200) % 2  # Flash every 200ms
+            if flash:
+                rects.append(pygame.draw.circle(self.screen, WHITE, 
+                                 (int(player_x), int(player_y)), 
+                                 15, 2))  # Draw white circle around player
+
+        # Update game over screen drawing
+        if sim.game_over:
+            game_over_text, _ = self.text.render(f"Game Over! Score: {sim.score}", 36, WHITE)
+            text_rect = game_over_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
+            rects.append(self.screen.blit(game_over_text, text_rect))
+
+        # Apply hurt effect and screen shake
+        if shaking:
+            self.apply_screen_shake()
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="BubbleBee")
+    parser.add_argument('--record', metavar='PATH',
+                        help="record every game's inputs to PATH for replay.py")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="render frame rate cap, e.g. 120 or 144, or 0 for none (default: %(default)s)")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="only redraw and update the changed parts of the screen "
+                             "(faster on software-rendered displays)")
+    parser.add_argument('--asset-cache', metavar='DIR',
+                        help="keep pre-scaled images in DIR to speed up the next start")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="time every frame and write the timings to PATH on exit "
+                             "(.csv, or .json); press F3 in game for the live overlay")
+    parser.add_argument('--scores', metavar='PATH', default='high_scores.db',
+                        help="high score database, may be shared by several instances (default: %(default)s)")
+    parser.add_argument('--leaderboard', metavar='HOST:PORT',
+                        help="also send scores to a leaderboard.py server and show its top scores "
+                             "('loopback' for an in-process one)")
+    parser.add_argument('--adaptive-quality', action=argparse.BooleanOptionalAction, default=True,
+                        help="draw less detail while frames take too long (default: on)")
+    parser.add_argument('--startup-timing', action='store_true',
+                        help="print the time to the first frame and until the game is ready to "
+                             "play, then quit")
+    parser.add_argument('--swarm', nargs='?', const='', metavar='CONFIG',
+                        help="swarm mode, with thousands of tiny bubbles and stingers; CONFIG is an "
+                             "optional JSON file overriding its settings (see swarm.py)")
+    parser.add_argument('--continuous', action='store_true',
+                        help="swept collisions, so fast bullets and bubbles never pass through "
+                             "small bubbles")
+    args = parser.parse_args()
+    if args.fps < 0:
+        parser.error("--fps can't be negative")
+    swarm_config = None
+    if args.swarm is not None:
+        if args.record or args.continuous:
+            parser.error("--swarm can't be combined with --record or --continuous")
+        try:
+            swarm_config = SwarmConfig.load(args.swarm) if args.swarm else SwarmConfig()
+        except (OSError, ValueError, TypeError) as e:
+            parser.error(f"can't use swarm config {args.swarm}: {e}")
+
+    game = Game(record_path=args.record, fps=args.fps, dirty_rects=args.dirty_rects,
+                asset_cache_dir=args.asset_cache, continuous=args.continuous,
+                profile_path=args.profile, adaptive_quality=args.adaptive_quality,
+                scores_path=args.scores, leaderboard_address=args.leaderboard,
+                startup_timing=args.startup_timing, swarm_config=swarm_config)
+    # Everything allocated so far lives for the whole session; keep the collector from
+    # rescanning it during play
+    gc.freeze()
     game.run()
\ No newline at end of file
@@ -0,0 +1,399 @@
+import math
+
+import numpy as np
+
+from broadphase import SpatialHash, SortedGrid
+
+FLOAT_FIELDS = ('x', 'y', 'prev_x', 'prev_y', 'dx', 'dy', 'radius', 'angle', 'shine_offset')
+HIT_TEST_CELLS = 1 << 20  # Largest point x bubble block first_hits() evaluates at once
+GRID_HIT_TEST_CELLS = 1 << 18  # From this many point x bubble pairs on, first_hits() uses a grid
+
+
+def time_of_entry(start_x, start_y, end_x, end_y, distance):
+    """Fraction of a step at which a point moving from start to end comes within distance of the origin.
+
+    Returns None if it never does, or if it already starts that close.
+    """
+    move_x = end_x - start_x
+    move_y = end_y - start_y
+    a = move_x * move_x + move_y * move_y
+    b = start_x * move_x + start_y * move_y
+    c = start_x * start_x + start_y * start_y - distance * distance
+    if c < 0 or b >= 0:
+        return None
+    discriminant = b * b - a * c
+    if discriminant < 0:
+        return None
+    t = (-b - math.sqrt(discriminant)) / a
+    return t if t <= 1 else None
+
+
+class StructOfArrays:
+    """Entities stored as one contiguous NumPy array per attribute.
+
+    Only the first `count` slots are live. Subclasses list their arrays in `fields`
+    as (name, dtype, shape of one entry) and must have x, y, prev_x, prev_y, dx
+    and dy. Removing entities moves survivors from the tail into the freed slots,
+    so the arrays stay packed and every per-frame update is a single slice operation.
+    """
+
+    fields = ()
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = capacity
+        for name, dtype, shape in self.fields:
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        for name, dtype, shape in self.fields:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def _append(self, count):
+        """Make room for count more entities and claim them; returns their slice"""
+        while self.count + count > self.capacity:
+            self._grow()
+        start, end = self.count, self.count + count
+        self.count = end
+        return slice(start, end)
+
+    def compact(self, removed):
+        """Swap-remove every flagged slot at once; survivors from the tail fill the holes"""
+        n = self.count
+        keep_count = n - int(np.count_nonzero(removed))
+        if keep_count == n:
+            return
+        holes = np.flatnonzero(removed[:keep_count])
+        movers = np.flatnonzero(~removed[keep_count:n]) + keep_count
+        for name, dtype, shape in self.fields:
+            array = getattr(self, name)
+            array[holes] = array[movers]
+        self.count = keep_count
+
+    def integrate(self, scale=1.0):
+        """Move everything by scale steps, keeping the old position for render interpolation"""
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.x[:n] += self.dx[:n] * scale
+        self.y[:n] += self.dy[:n] * scale
+
+    def cull(self, width, height, margin=0):
+        """Drop everything more than margin (a number or per-entity array) outside the window"""
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        self.compact((x < -margin) | (x > width + margin) | (y < -margin) | (y > height + margin))
+
+
+class BubbleField(StructOfArrays):
+    """Struct-of-arrays bubble store, see StructOfArrays"""
+
+    fields = tuple((name, float, ()) for name in FLOAT_FIELDS) + (
+        ('color', np.uint8, (3,)),
+        ('generation', np.uint8, ()),  # How many splits it came from
+    )
+
+    def __init__(self, capacity=64):
+        super().__init__(capacity)
+        self.grid = SpatialHash()
+
+    def add(self, x, y, dx, dy, radius, color, shine_offset, angle=0, generation=0):
+        if self.count == self.capacity:
+            self._grow()
+        index = self.count
+        self.x[index] = self.prev_x[index] = x
+        self.y[index] = self.prev_y[index] = y
+        self.dx[index] = dx
+        self.dy[index] = dy
+        self.radius[index] = radius
+        self.angle[index] = angle
+        self.color[index] = color
+        self.shine_offset[index] = shine_offset
+        self.generation[index] = generation
+        self.count += 1
+        return index
+
+    def add_many(self, x, y, dx, dy, radius, color, shine_offset, generation=0):
+        """Append len(x) bubbles from arrays; color is an (n, 3) array"""
+        new = self._append(len(x))
+        self.x[new] = self.prev_x[new] = x
+        self.y[new] = self.prev_y[new] = y
+        self.dx[new] = dx
+        self.dy[new] = dy
+        self.radius[new] = radius
+        self.angle[new] = 0
+        self.color[new] = color
+        self.shine_offset[new] = shine_offset
+        self.generation[new] = generation
+
+    def integrate(self, scale=1.0):
+        super().integrate(scale)
+        self.angle[:self.count] += scale  # Rotate the bubbles slowly
+
+    def interpolated(self, alpha):
+        """Positions blended between the previous and current step, for drawing"""
+        n = self.count
+        prev_x, prev_y = self.prev_x[:n], self.prev_y[:n]
+        return prev_x + (self.x[:n] - prev_x) * alpha, prev_y + (self.y[:n] - prev_y) * alpha
+
+    def cull(self, width, height):
+        """Drop bubbles that are more than one diameter outside the window"""
+        super().cull(width, height, self.radius[:self.count] * 2)
+
+    def enforce_minimum_speed(self, mask, min_speed_factor):
+        """Scale up every flagged bubble that has slowed below its minimum speed"""
+        index = np.flatnonzero(mask[:self.count])
+        dx, dy = self.dx[index], self.dy[index]
+        original_speed = 6.0 * (10 / self.radius[index])
+        min_speed = original_speed * min_speed_factor
+        current_speed = np.hypot(dx, dy)
+
+        slow = (current_speed < min_speed) & (current_speed > 0)
+        speed_factor = min_speed[slow] / current_speed[slow]
+        self.dx[index[slow]] = dx[slow] * speed_factor
+        self.dy[index[slow]] = dy[slow] * speed_factor
+
+    def touches_any(self, xs, ys, radius, bound=None):
+        """True if any circle of the given radius centred on one of the points touches a bubble.
+
+        bound is an optional circle (x, y, radius) enclosing all of those circles;
+        bubbles that don't touch it are ruled out before the per-point test.
+        """
+        n = self.count
+        bubble_x, bubble_y, bubble_radius = self.x[:n], self.y[:n], self.radius[:n]
+        if bound is not None:
+            bound_x, bound_y, bound_radius = bound
+            near = np.flatnonzero(np.hypot(bound_x - bubble_x, bound_y - bubble_y) < bubble_radius + bound_radius)
+            if len(near) == 0:
+                return False
+            bubble_x, bubble_y, bubble_radius = bubble_x[near], bubble_y[near], bubble_radius[near]
+        distance = np.hypot(np.asarray(xs)[:, None] - bubble_x, np.asarray(ys)[:, None] - bubble_y)
+        return bool(np.any(distance < bubble_radius + radius))
+
+    def first_hits(self, xs, ys, prev_xs=None, prev_ys=None):
+        """For each point, the index of the first bubble containing it, or -1.
+
+        Given the points' previous positions too, the test is swept: each point hits
+        the bubble its path, relative to the bubble's own movement since prev_x/prev_y,
+        enters earliest, so fast points can't skip over small bubbles.
+
+        Evaluates the whole point x bubble distance matrix with NumPy, in blocks of
+        points so it stays within HIT_TEST_CELLS entries. Once that matrix gets large,
+        points without previous positions are only tested against the bubbles in
+        their neighbouring grid cells, with the same result.
+        """
+        n = self.count
+        result = np.full(len(xs), -1, dtype=np.intp)
+        if n == 0:
+            return result
+        if prev_xs is None and len(xs) * n >= GRID_HIT_TEST_CELLS:
+            return self.first_hits_near(np.asarray(xs), np.asarray(ys))
+        bubble_x, bubble_y = self.x[:n], self.y[:n]
+        radius_sq = self.radius[:n] ** 2
+        rows = max(1, HIT_TEST_CELLS // n)
+        for start in range(0, len(xs), rows):
+            block_x = np.asarray(xs[start:start + rows])[:, None]
+            block_y = np.asarray(ys[start:start + rows])[:, None]
+            if prev_xs is None:
+                inside = (block_x - bubble_x) ** 2 + (block_y - bubble_y) ** 2 < radius_sq
+                first = inside.argmax(axis=1)
+                result[start:start + rows] = np.where(inside[np.arange(len(first)), first], first, -1)
+                continue
+
+            # Point relative to each bubble at the start of the step, and its relative movement
+            start_x = np.asarray(prev_xs[start:start + rows])[:, None] - self.prev_x[:n]
+            start_y = np.asarray(prev_ys[start:start + rows])[:, None] - self.prev_y[:n]
+            move_x = block_x - bubble_x - start_x
+            move_y = block_y - bubble_y - start_y
+            a = move_x * move_x + move_y * move_y
+            b = start_x * move_x + start_y * move_y
+            c = start_x * start_x + start_y * start_y - radius_sq
+            discriminant = b * b - a * c
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = (-b - np.sqrt(discriminant)) / a
+            t = np.where(c < 0, 0.0, np.where((b < 0) & (discriminant >= 0) & (t <= 1), t, np.inf))
+            first = t.argmin(axis=1)
+            result[start:start + rows] = np.where(np.isfinite(t[np.arange(len(first)), first]), first, -1)
+        return result
+
+    def first_hits_near(self, xs, ys):
+        n = self.count
+        bubble_x, bubble_y, radius = self.x[:n], self.y[:n], self.radius[:n]
+        point, bubble = SortedGrid(bubble_x, bubble_y, radius).near_points(xs, ys)
+        inside = (xs[point] - bubble_x[bubble]) ** 2 + (ys[point] - bubble_y[bubble]) ** 2 < radius[bubble] ** 2
+        result = np.full(len(xs), n, dtype=np.intp)
+        np.minimum.at(result, point[inside], bubble[inside])
+        result[result == n] = -1
+        return result
+
+    def resolve_collisions_batched(self, min_speed_factor):
+        """Bubble-vs-bubble pass over all contacts at once, for crowds too big for resolve_collisions().
+
+        Contacts come from a SortedGrid and are resolved together instead of one after
+        another: each overlapping pair is pushed apart by half its overlap per bubble,
+        summed over a bubble's contacts, and pairs still closing in exchange velocity
+        like in resolve_collisions(), averaged over a bubble's contacts. So crowded
+        bubbles can take a few steps to settle, but the cost stays close to linear.
+        """
+        n = self.count
+        if n < 2:
+            return
+        x, y, radius = self.x[:n], self.y[:n], self.radius[:n]
+        dx, dy = self.dx[:n], self.dy[:n]
+        i, j = SortedGrid(x, y, radius).pairs()
+        sep_x = x[j] - x[i]
+        sep_y = y[j] - y[i]
+        reach = radius[i] + radius[j]
+        contact = sep_x * sep_x + sep_y * sep_y < reach * reach
+        if not np.any(contact):
+            return
+        i, j, sep_x, sep_y, reach = i[contact], j[contact], sep_x[contact], sep_y[contact], reach[contact]
+        distance = np.hypot(sep_x, sep_y)
+
+        # Push apart along the line between the centres; exactly overlapping pairs along x
+        apart = distance > 0
+        safe_distance = np.where(apart, distance, 1.0)
+        normal_x = np.where(apart, sep_x / safe_distance, 1.0)
+        normal_y = np.where(apart, sep_y / safe_distance, 0.0)
+        overlap = (reach - distance) / 2
+        push_x = normal_x * overlap
+        push_y = normal_y * overlap
+
+        # Velocity exchange with masses based on radius, for pairs moving towards each other
+        closing = (dx[j] - dx[i]) * sep_x + (dy[j] - dy[i]) * sep_y < 0
+        bi, bj = i[closing], j[closing]
+        m1 = radius[bi] ** 2
+        m2 = radius[bj] ** 2
+        total_mass = m1 + m2
+        delta_x = dx[bj] - dx[bi]
+        delta_y = dy[bj] - dy[bi]
+        bounces = np.bincount(bi, minlength=n) + np.bincount(bj, minlength=n)
+        change_x = (np.bincount(bi, 2 * m2 / total_mass * delta_x, n) -
+                    np.bincount(bj, 2 * m1 / total_mass * delta_x, n))
+        change_y = (np.bincount(bi, 2 * m2 / total_mass * delta_y, n) -
+                    np.bincount(bj, 2 * m1 / total_mass * delta_y, n))
+
+        x += np.bincount(j, push_x, n) - np.bincount(i, push_x, n)
+        y += np.bincount(j, push_y, n) - np.bincount(i, push_y, n)
+        bounced = bounces > 0
+        dx[bounced] += change_x[bounced] / bounces[bounced]
+        dy[bounced] += change_y[bounced] / bounces[bounced]
+
+        touched = np.zeros(n, dtype=bool)
+        touched[i] = touched[j] = True
+        self.enforce_minimum_speed(touched, min_speed_factor)
+
+    def resolve_collisions(self, min_speed_factor, scale=1.0, swept=False):
+        """Bubble-vs-bubble pass using the spatial hash as broadphase.
+
+        Pairs are visited in the same (i, j) order as a brute-force double loop and the
+        grid is kept up to date as bubbles get pushed apart, so the contacts found are
+        exactly the ones the O(n^2) loop would find. The pass runs on plain lists because
+        it is inherently sequential; bubbles that took part in a collision get their
+        minimum speed enforced in one vectorized step afterwards.
+
+        With swept set, pairs that passed through each other during the step (moving
+        from prev_x/prev_y by scale steps) also collide: both are put back where they
+        first touched, bounce there and travel the rest of the step on their new course.
+        """
+        n = self.count
+        x = self.x[:n].tolist()
+        y = self.y[:n].tolist()
+        prev_x = self.prev_x[:n].tolist()
+        prev_y = self.prev_y[:n].tolist()
+        dx = self.dx[:n].tolist()
+        dy = self.dy[:n].tolist()
+        radius = self.radius[:n].tolist()
+        touched = np.zeros(n, dtype=bool)
+
+        if swept:
+            def reach(k):
+                # Circle around everywhere bubble k has been this step
+                half_x = (x[k] - prev_x[k]) / 2
+                half_y = (y[k] - prev_y[k]) / 2
+                return x[k] - half_x, y[k] - half_y, radius[k] + math.hypot(half_x, half_y)
+        else:
+            def reach(k):
+                return x[k], y[k], radius[k]
+
+        grid = self.grid
+        grid.clear()
+        for index in range(n):
+            grid.insert(index, *reach(index))
+
+        for i in range(n):
+            candidates = sorted(j for j in grid.query(*reach(i)) if j > i)
+            k = 0
+            while k < len(candidates):
+                j = candidates[k]
+                k += 1
+
+                impact = None
+                distance = math.hypot(x[i] - x[j], y[i] - y[j])
+                if distance >= radius[i] + radius[j]:
+                    if not swept:
+                        continue
+                    impact = time_of_entry(prev_x[j] - prev_x[i], prev_y[j] - prev_y[i],
+                                           x[j] - x[i], y[j] - y[i], radius[i] + radius[j])
+                    if impact is None:
+                        continue
+                    # Rewind both bubbles to where they touched
+                    x[i] = prev_x[i] + (x[i] - prev_x[i]) * impact
+                    y[i] = prev_y[i] + (y[i] - prev_y[i]) * impact
+                    x[j] = prev_x[j] + (x[j] - prev_x[j]) * impact
+                    y[j] = prev_y[j] + (y[j] - prev_y[j]) * impact
+                else:
+                    # First separate overlapping bubbles
+                    sep_x = x[j] - x[i]
+                    sep_y = y[j] - y[i]
+                    if distance == 0:  # Handle edge case of exact overlap
+                        x[j] += 1
+                    else:
+                        overlap = (radius[i] + radius[j] - distance) / 2
+                        sep_x /= distance
+                        sep_y /= distance
+                        x[i] -= sep_x * overlap
+                        y[i] -= sep_y * overlap
+                        x[j] += sep_x * overlap
+                        y[j] += sep_y * overlap
+
+                # Calculate new velocities using conservation of momentum, masses based on radius
+                m1 = radius[i] ** 2
+                m2 = radius[j] ** 2
+                total_mass = m1 + m2
+                new_dx1 = (m1 - m2) / total_mass * dx[i] + (2 * m2) / total_mass * dx[j]
+                new_dy1 = (m1 - m2) / total_mass * dy[i] + (2 * m2) / total_mass * dy[j]
+                new_dx2 = (2 * m1) / total_mass * dx[i] + (m2 - m1) / total_mass * dx[j]
+                new_dy2 = (2 * m1) / total_mass * dy[i] + (m2 - m1) / total_mass * dy[j]
+                dx[i], dx[j] = new_dx1, new_dx2
+                dy[i], dy[j] = new_dy1, new_dy2
+                touched[i] = touched[j] = True
+
+                if impact is not None:
+                    # Spend the rest of the step moving apart
+                    remaining = (1 - impact) * scale
+                    x[i] += dx[i] * remaining
+                    y[i] += dy[i] * remaining
+                    x[j] += dx[j] * remaining
+                    y[j] += dy[j] * remaining
+
+                grid.move(i, *reach(i))
+                grid.move(j, *reach(j))
+
+                # Bubble i has moved, so the rest of its row needs a fresh query
+                candidates = sorted(c for c in grid.query(*reach(i)) if c > j)
+                k = 0
+
+        self.x[:n] = x
+        self.y[:n] = y
+        self.dx[:n] = dx
+        self.dy[:n] = dy
+        self.enforce_minimum_speed(touched, min_speed_factor)
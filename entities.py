@@ -0,0 +1,48 @@
+class Bullet:
+    __slots__ = ('x', 'y', 'prev_x', 'prev_y', 'dx', 'dy', 'rotation')
+
+    def __init__(self):
+        self.x = self.y = self.prev_x = self.prev_y = 0.0
+        self.dx = self.dy = 0.0
+        self.rotation = 0.0  # Direction of travel in degrees, for drawing
+
+
+class Pool:
+    """Free-list object pool.
+
+    Live objects sit packed in `active`; released ones go on a free list and are handed
+    out again by acquire() instead of allocating new ones. Removal swaps the last
+    live object into the hole, so it is O(1) and never copies the list.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.active = []
+        self.free = []
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __getitem__(self, index):
+        return self.active[index]
+
+    def acquire(self):
+        """Return a recycled or new object; the caller must set all of its fields"""
+        obj = self.free.pop() if self.free else self.factory()
+        self.active.append(obj)
+        return obj
+
+    def release_at(self, index):
+        active = self.active
+        obj = active[index]
+        last = active.pop()
+        if index < len(active):
+            active[index] = last
+        self.free.append(obj)
+
+    def clear(self):
+        self.free.extend(self.active)
+        self.active.clear()
@@ -0,0 +1,203 @@
+"""Shared leaderboard for several cabinets: a small asyncio server and a background client.
+
+The protocol is one JSON object per line over TCP:
+
+    {"op": "submit", "scores": [{"id", "name", "score", "seed", "played_at"}, ...]}
+        -> {"ok": true, "added": n}
+    {"op": "top", "limit": 5}
+        -> {"ok": true, "scores": [[name, score], ...]}
+
+Every score carries a unique id, so a batch that is retried after a lost reply is
+not counted twice.
+
+    python leaderboard.py --port 8765 --db leaderboard.db
+
+The game talks to it through LeaderboardClient, whose methods never wait on the
+network: submissions are queued and sent in batches by a background thread, which
+retries with backoff while the server is unreachable, and top() returns the last
+leaderboard fetched, refreshing it in the background once it is older than the TTL.
+LoopbackLeaderboard has the same interface without any network, for testing.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+import uuid
+
+from scores import ScoreStore
+
+DEFAULT_PORT = 8765
+MAX_BATCH = 100
+
+
+async def handle_connection(store, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if request['op'] == 'submit':
+                    added = sum(store.add_once(entry['id'], str(entry['name']), int(entry['score']),
+                                               entry.get('seed'), entry.get('played_at'))
+                                for entry in request['scores'])
+                    response = {'ok': True, 'added': added}
+                elif request['op'] == 'top':
+                    response = {'ok': True, 'scores': store.top(int(request.get('limit', 5)))}
+                else:
+                    response = {'ok': False, 'error': f"unknown op {request['op']!r}"}
+            except (ValueError, KeyError, TypeError) as e:
+                response = {'ok': False, 'error': str(e)}
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, db_path, ready=None):
+    store = ScoreStore(db_path, legacy_path=None)
+    server = await asyncio.start_server(lambda r, w: handle_connection(store, r, w), host, port)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+class LeaderboardClient:
+    """Non-blocking connection to a leaderboard server, run from a background thread"""
+
+    def __init__(self, host, port=DEFAULT_PORT, ttl=30, flush_interval=1.0, timeout=5,
+                 on_update=None):
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.on_update = on_update  # Called from the background thread when top() has news
+        self.pending = []  # Scores not yet acknowledged by the server
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.scores = None  # Last leaderboard fetched, or None
+        self.fetched_at = 0
+        self.limit = 5
+        self.online = False
+        self.closing = False
+        self.thread = threading.Thread(target=self.run, name='leaderboard', daemon=True)
+        self.thread.start()
+
+    def submit(self, name, score, seed=None):
+        with self.lock:
+            self.pending.append({'id': uuid.uuid4().hex, 'name': name, 'score': score,
+                                 'seed': seed, 'played_at': time.time()})
+        self.fetched_at = 0  # The leaderboard will likely change
+        self.wake.set()
+
+    def top(self, limit=5):
+        """The cached leaderboard (None until the first fetch), refreshed in the background"""
+        self.limit = limit
+        if time.monotonic() - self.fetched_at > self.ttl:
+            self.wake.set()
+        return self.scores
+
+    def close(self, timeout=1.0):
+        """Give the background thread a moment to send what is still pending"""
+        self.closing = True
+        self.wake.set()
+        self.thread.join(timeout)
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        backoff = self.flush_interval
+        while True:
+            self.wake.clear()
+            stale = time.monotonic() - self.fetched_at > self.ttl
+            try:
+                loop.run_until_complete(asyncio.wait_for(self.exchange(stale), self.timeout))
+                self.online = True
+                backoff = self.flush_interval
+            except (OSError, asyncio.TimeoutError, ValueError):
+                self.online = False
+                backoff = min(backoff * 2, 60)  # Wait longer and longer while the server is away
+            if self.closing:
+                break
+            self.wake.wait(self.flush_interval if self.online else backoff)
+        loop.close()
+
+    async def exchange(self, fetch):
+        with self.lock:
+            batch = self.pending[:MAX_BATCH]
+        if not batch and not fetch:
+            return
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if batch:
+                await self.request(reader, writer, {'op': 'submit', 'scores': batch})
+                with self.lock:
+                    del self.pending[:len(batch)]
+            if fetch or batch:
+                response = await self.request(reader, writer, {'op': 'top', 'limit': self.limit})
+                self.scores = [tuple(entry) for entry in response['scores']]
+                self.fetched_at = time.monotonic()
+                if self.on_update is not None:
+                    self.on_update()
+        finally:
+            writer.close()
+
+    async def request(self, reader, writer, message):
+        writer.write(json.dumps(message).encode() + b'\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        if not response.get('ok'):
+            raise ValueError(response.get('error'))
+        return response
+
+
+class LoopbackLeaderboard:
+    """LeaderboardClient stand-in that keeps the leaderboard in memory"""
+
+    def __init__(self, on_update=None):
+        self.store = ScoreStore(':memory:', legacy_path=None)
+        self.on_update = on_update
+        self.online = True
+
+    def submit(self, name, score, seed=None):
+        self.store.add(name, score, seed)
+        if self.on_update is not None:
+            self.on_update()
+
+    def top(self, limit=5):
+        return self.store.top(limit)
+
+    def close(self, timeout=None):
+        self.store.close()
+
+
+def connect(address, on_update=None):
+    """A client for "host:port", "host", or "loopback" """
+    if address == 'loopback':
+        return LoopbackLeaderboard(on_update)
+    host, _, port = address.partition(':')
+    return LeaderboardClient(host, int(port or DEFAULT_PORT), on_update=on_update)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BubbleBee leaderboard server")
+    parser.add_argument('--host', default='0.0.0.0', help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port (default: %(default)s)")
+    parser.add_argument('--db', default='leaderboard.db', help="score database (default: %(default)s)")
+    args = parser.parse_args(argv)
+    print(f"Leaderboard listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port, args.db))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
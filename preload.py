@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pygame
+
+
+class Preloader:
+    """Runs slow startup jobs one after another on a background thread.
+
+    Jobs are (name, function) pairs; their results and how long each took are kept
+    by name. When all are done a pygame event of done_event_type is posted, so a
+    screen waiting in pygame.event.wait() wakes up to use them. A job that raises
+    stops the others, and the exception is raised again by wait().
+    """
+
+    def __init__(self, jobs, done_event_type=None):
+        self.jobs = jobs
+        self.done_event_type = done_event_type
+        self.results = {}
+        self.timings_ms = {}
+        self.error = None
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='preload', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            for name, job in self.jobs:
+                start = time.perf_counter()
+                self.results[name] = job()
+                self.timings_ms[name] = (time.perf_counter() - start) * 1000
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.finished.set()
+            if self.done_event_type is not None and pygame.display.get_init():
+                pygame.event.post(pygame.event.Event(self.done_event_type))
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    def wait(self):
+        """Block until every job has run; returns the results by name"""
+        self.finished.wait()
+        if self.error is not None:
+            raise self.error
+        return self.results
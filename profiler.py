@@ -0,0 +1,102 @@
+"""Frame profiler: per-stage timings for the last few hundred frames.
+
+A frame is split into stages by calling lap(stage) at the end of each one; the
+time since the previous lap is added to that stage. end_frame() stores the frame
+in a ring buffer together with the entity counts. Nothing here allocates per
+frame, and code that is handed no profiler (None) skips it entirely.
+"""
+import csv
+import json
+import time
+
+import numpy as np
+
+STAGES = ('input', 'spawn', 'integrate', 'collide', 'bullets', 'draw', 'flip')
+INPUT, SPAWN, INTEGRATE, COLLIDE, BULLETS, DRAW, FLIP = range(len(STAGES))
+
+
+class Profiler:
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.stage_ns = np.zeros((capacity, len(STAGES)), dtype=np.int64)
+        self.frame_ns = np.zeros(capacity, dtype=np.int64)
+        self.bubbles = np.zeros(capacity, dtype=np.int32)
+        self.bullets = np.zeros(capacity, dtype=np.int32)
+        self.frames = 0  # Frames recorded in total; the ring holds the last `capacity`
+        self.current = [0] * len(STAGES)
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    def __len__(self):
+        return min(self.frames, self.capacity)
+
+    def clear(self):
+        self.frames = 0
+        self.begin_frame()
+
+    def begin_frame(self):
+        self.frame_start = self.last = time.perf_counter_ns()
+        for stage in range(len(STAGES)):
+            self.current[stage] = 0
+
+    def lap(self, stage):
+        now = time.perf_counter_ns()
+        self.current[stage] += now - self.last
+        self.last = now
+
+    def end_frame(self, bubbles=0, bullets=0):
+        row = self.frames % self.capacity
+        self.stage_ns[row] = self.current
+        self.frame_ns[row] = time.perf_counter_ns() - self.frame_start
+        self.bubbles[row] = bubbles
+        self.bullets[row] = bullets
+        self.frames += 1
+        self.begin_frame()
+
+    def rows(self):
+        """Ring buffer row indices of the stored frames, oldest first"""
+        count = len(self)
+        return np.arange(self.frames - count, self.frames) % self.capacity
+
+    def frame_times_ms(self):
+        return self.frame_ns[self.rows()] / 1e6
+
+    def summary(self):
+        """Frame time percentiles and mean time per stage, in milliseconds"""
+        if not len(self):
+            return {}
+        rows = self.rows()
+        frame_ms = self.frame_ns[rows] / 1e6
+        stage_ms = self.stage_ns[rows].mean(axis=0) / 1e6
+        return {
+            'frames': len(rows),
+            'p50_ms': float(np.percentile(frame_ms, 50)),
+            'p99_ms': float(np.percentile(frame_ms, 99)),
+            'max_ms': float(frame_ms.max()),
+            'stages_ms': dict(zip(STAGES, stage_ms.tolist())),
+        }
+
+    def export(self, path):
+        """Write the stored frames to path as CSV, or as JSON if it ends in .json"""
+        rows = self.rows()
+        frames = range(self.frames - len(rows), self.frames)
+        if path.endswith('.json'):
+            data = {
+                'stages': list(STAGES),
+                'summary': self.summary(),
+                'frames': [
+                    {'frame': frame, 'frame_ns': int(self.frame_ns[row]),
+                     'stage_ns': self.stage_ns[row].tolist(),
+                     'bubbles': int(self.bubbles[row]), 'bullets': int(self.bullets[row])}
+                    for frame, row in zip(frames, rows)
+                ],
+            }
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=1)
+            return
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'frame_ns'] + [f'{stage}_ns' for stage in STAGES] + ['bubbles', 'bullets'])
+            for frame, row in zip(frames, rows):
+                writer.writerow([frame, int(self.frame_ns[row])] + self.stage_ns[row].tolist() +
+                                [int(self.bubbles[row]), int(self.bullets[row])])
@@ -0,0 +1,60 @@
+from collections import deque
+
+# Detail levels, each dropping one more thing than the one before
+FULL, PLAIN_BUBBLES, FEW_CLOUDS, NO_SHAKE, SIMPLE_STINGERS = range(5)
+FEW_CLOUDS_COUNT = 2
+
+
+class QualityController:
+    """Render detail level chosen from how long recent frames took to draw.
+
+    It is fed the work time of every frame (clock.get_rawtime(); get_time() also
+    counts the wait in tick() and so never shows headroom). When the average over
+    the last `window` frames comes near the frame budget it drops a level, and it
+    only adds one back once frames are well under budget. After every change it
+    waits `hold_frames` for the new level to show in the timings, so it never
+    flickers between two levels.
+    """
+
+    def __init__(self, budget_ms, window=30, hold_frames=60, degrade_at=0.9, restore_at=0.6):
+        self.budget_ms = budget_ms
+        self.samples = deque(maxlen=window)
+        self.hold_frames = hold_frames
+        self.degrade_ms = budget_ms * degrade_at
+        self.restore_ms = budget_ms * restore_at
+        self.level = FULL
+        self.hold = 0
+
+    def update(self, work_ms):
+        self.samples.append(work_ms)
+        if self.hold:
+            self.hold -= 1
+            return
+        if len(self.samples) < self.samples.maxlen:
+            return
+        average = sum(self.samples) / len(self.samples)
+        if average > self.degrade_ms and self.level < SIMPLE_STINGERS:
+            self.set_level(self.level + 1)
+        elif average < self.restore_ms and self.level > FULL:
+            self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        self.level = level
+        self.samples.clear()
+        self.hold = self.hold_frames
+
+    @property
+    def bubble_details(self):
+        """Whether bubbles get their outline and shine"""
+        return self.level < PLAIN_BUBBLES
+
+    def cloud_count(self, clouds):
+        return len(clouds) if self.level < FEW_CLOUDS else min(len(clouds), FEW_CLOUDS_COUNT)
+
+    @property
+    def screen_shake(self):
+        return self.level < NO_SHAKE
+
+    @property
+    def detailed_stingers(self):
+        return self.level < SIMPLE_STINGERS
@@ -0,0 +1,131 @@
+"""Compact binary input recordings that replay bit-exactly through the Simulation.
+
+A recording is a fixed header followed by one 5-byte record per physics step:
+
+    header: magic, version, seed, step count, final score, final state digest, options
+    step:   mouse x, mouse y, mouse button bitmask
+
+Every step is STEP_MS long, so the step index is the tick. The options bitmask
+holds the Simulation settings that change the rules (OPTION_CONTINUOUS). VERSION
+goes up whenever the rules themselves change, since older recordings would no
+longer replay to the same end.
+
+Steps are packed into a preallocated chunk buffer and written out a chunk at a
+time, so recording does not allocate per step. The step count, score and digest
+are patched into the header when the recording is closed; a recording cut short
+by a crash has a step count of 0 and is read up to the last complete step.
+
+Run `python replay.py <file>` to replay a recording headless and check it still
+ends with the recorded score and state.
+"""
+import struct
+import sys
+import time
+import zlib
+
+from simulation import Simulation, Inputs
+
+MAGIC = b'BBRP'
+VERSION = 4
+HEADER = struct.Struct('<4sHQIiIB')
+STEP = struct.Struct('<hhB')
+CHUNK_STEPS = 4096
+OPTION_CONTINUOUS = 1
+
+
+def state_digest(sim):
+    """CRC32 over the score, lives, clock, player and every live bubble"""
+    n = sim.bubbles.count
+    crc = zlib.crc32(struct.pack('<iiid', sim.score, sim.lives, n, sim.time_ms))
+    crc = zlib.crc32(struct.pack('<dd', *sim.player_pos), crc)
+    for name in ('x', 'y', 'dx', 'dy', 'radius'):
+        crc = zlib.crc32(getattr(sim.bubbles, name)[:n].tobytes(), crc)
+    return crc
+
+
+class ReplayRecorder:
+    def __init__(self, path, seed, continuous=False):
+        self.file = open(path, 'wb')
+        self.seed = seed
+        self.options = OPTION_CONTINUOUS if continuous else 0
+        self.step_count = 0
+        self.buffer = bytearray(STEP.size * CHUNK_STEPS)
+        self.offset = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, 0, 0, 0, self.options))
+
+    def record(self, mouse_x, mouse_y, buttons):
+        STEP.pack_into(self.buffer, self.offset, mouse_x, mouse_y, buttons)
+        self.offset += STEP.size
+        self.step_count += 1
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[:self.offset])
+        self.offset = 0
+
+    def close(self, sim=None):
+        """Write out pending steps and, given the finished simulation, its final state"""
+        if self.file.closed:
+            return
+        self.flush()
+        if sim is not None:
+            self.file.seek(0)
+            self.file.write(HEADER.pack(MAGIC, VERSION, self.seed, self.step_count,
+                                        sim.score, state_digest(sim), self.options))
+        self.file.close()
+
+
+class ReplayReader:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a replay")
+        (magic, version, self.seed, step_count, self.final_score, self.digest,
+         options) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        self.continuous = bool(options & OPTION_CONTINUOUS)
+
+        # Unfinished recordings have no step count; use every complete step
+        self.complete = step_count > 0
+        available = (len(self.data) - HEADER.size) // STEP.size
+        self.step_count = min(step_count, available) if self.complete else available
+
+    def __len__(self):
+        return self.step_count
+
+    def __iter__(self):
+        end = HEADER.size + self.step_count * STEP.size
+        return STEP.iter_unpack(memoryview(self.data)[HEADER.size:end])
+
+
+def replay(path):
+    """Play a recording back headless and return the finished simulation and its reader"""
+    reader = ReplayReader(path)
+    sim = Simulation(reader.seed, continuous=reader.continuous)
+    step = sim.step
+    for mouse_x, mouse_y, buttons in reader:
+        step(Inputs(mouse_x, mouse_y, bool(buttons & 1)))
+    return sim, reader
+
+
+def main(paths):
+    failed = False
+    for path in paths:
+        start = time.perf_counter()
+        sim, reader = replay(path)
+        elapsed = time.perf_counter() - start
+        digest = state_digest(sim)
+        speedup = sim.time_ms / 1000 / elapsed if elapsed else float('inf')
+        print(f"{path}: {len(reader)} steps, score {sim.score}, digest {digest:08x}, "
+              f"{elapsed:.2f}s ({speedup:.0f}x real time)")
+        if reader.complete and (sim.score != reader.final_score or digest != reader.digest):
+            print(f"  MISMATCH: recorded score {reader.final_score}, digest {reader.digest:08x}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+"""High-score store: every finished game in an SQLite database.
+
+Each score is one atomic INSERT, so a crash can never lose the table, and several
+game instances can share one database; writers wait for each other (busy_timeout)
+instead of overwriting each other's results. WAL mode lets the top-N query run
+while another instance writes. SQLite can't use WAL on network file systems, where
+it quietly stays in its default rollback journal mode, which is still safe.
+
+The first time a database is opened, the scores from the old high_scores.txt
+(lines of "name,score") are imported into it.
+
+    python scores.py                    show the top 10
+    python scores.py --player NAME      show one player's best games
+    python scores.py --import FILE      import another text score file
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_PATH = 'high_scores.db'
+LEGACY_PATH = 'high_scores.txt'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    played_at REAL NOT NULL,
+    seed INTEGER
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC);
+CREATE INDEX IF NOT EXISTS scores_by_player ON scores (name, score DESC);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS submissions (id TEXT PRIMARY KEY);
+"""
+
+
+def read_text(path):
+    """(name, score) pairs from a "name,score" text file; names may contain commas.
+
+    Lines that don't parse are skipped.
+    """
+    rows = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            name, _, score = line.strip().rpartition(',')
+            try:
+                rows.append((name, int(score)))
+            except ValueError:
+                continue
+    return rows
+
+
+class ScoreStore:
+    def __init__(self, path=DEFAULT_PATH, legacy_path=LEGACY_PATH):
+        # The game opens the store on its loading thread and uses it from the main thread
+        # afterwards, never from both at once
+        self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        if legacy_path and os.path.exists(legacy_path):
+            with self.db:
+                # The marker and the scores commit together, so only one instance ever imports
+                marked = self.db.execute("INSERT OR IGNORE INTO meta VALUES ('legacy_imported', ?)",
+                                         (legacy_path,))
+                if marked.rowcount:
+                    self.insert_text(legacy_path)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, name, score, seed=None, played_at=None):
+        with self.db:
+            self.db.execute("INSERT INTO scores (name, score, played_at, seed) VALUES (?, ?, ?, ?)",
+                            (name, score, played_at or time.time(), seed))
+
+    def add_once(self, submission_id, name, score, seed=None, played_at=None):
+        """add() unless a score with this id was added before; returns whether it was added"""
+        with self.db:
+            new = self.db.execute("INSERT OR IGNORE INTO submissions VALUES (?)", (submission_id,)).rowcount
+            if new:
+                self.db.execute("INSERT INTO scores (name, score, played_at, seed) VALUES (?, ?, ?, ?)",
+                                (name, score, played_at or time.time(), seed))
+        return bool(new)
+
+    def top(self, limit=5):
+        """The best (name, score) pairs, highest first; earlier games win ties"""
+        return self.db.execute("SELECT name, score FROM scores ORDER BY score DESC, id LIMIT ?",
+                               (limit,)).fetchall()
+
+    def player(self, name, limit=10):
+        """One player's best (score, played_at) pairs, highest first"""
+        return self.db.execute("SELECT score, played_at FROM scores WHERE name = ? "
+                               "ORDER BY score DESC, id LIMIT ?", (name, limit)).fetchall()
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def insert_text(self, path):
+        played_at = os.path.getmtime(path)
+        rows = [(name, score, played_at) for name, score in read_text(path)]
+        self.db.executemany("INSERT INTO scores (name, score, played_at) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def import_text(self, path):
+        """Add the scores from a text score file; returns how many there were"""
+        with self.db:
+            return self.insert_text(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BubbleBee high scores")
+    parser.add_argument('--db', default=DEFAULT_PATH, help="score database (default: %(default)s)")
+    parser.add_argument('--player', help="show this player's best games")
+    parser.add_argument('--import', dest='import_path', metavar='FILE', help="import a name,score text file")
+    parser.add_argument('--top', type=int, default=10, help="how many scores to show (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = ScoreStore(args.db)
+    if args.import_path:
+        print(f"Imported {store.import_text(args.import_path)} scores")
+    if args.player:
+        for score, played_at in store.player(args.player, args.top):
+            print(f"{score:6}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(played_at))}")
+    else:
+        for i, (name, score) in enumerate(store.top(args.top), 1):
+            print(f"{i:3}. {name}: {score}")
+        print(f"{store.count()} games played")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+import math
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from bee import BeeTransform, BOUND_RADIUS, SEGMENT_RADIUS
+from broadphase import StripIndex
+from bubble_field import BubbleField
+from profiler import SPAWN, INTEGRATE, COLLIDE, BULLETS
+from entities import Bullet, Pool
+
+# Gameplay constants
+WINDOW_WIDTH = 1024
+WINDOW_HEIGHT = 1024
+MIN_SPEED_FACTOR = 0.2  # 10% of original speed
+PLAYER_SPEED = 0.05  # Speed multiplier for player movement (0.1 = slow, 0.5 = fast)
+STEP_MS = 1000 / 60  # Physics runs at a fixed 60 steps per second; speeds are per step
+SPAWN_ATTEMPTS = 8  # Positions tried along the edge before a spawn is given up
+
+# Add bubble colors
+BUBBLE_COLORS = [
+    (173, 216, 230),  # light blue
+    (221, 160, 221),  # plum
+    (152, 251, 152),  # pale green
+    (255, 182, 193),  # light pink
+    (238, 232, 170),  # pale goldenrod
+]
+
+# Player input for one step: crosshair position and whether the fire button is held
+Inputs = namedtuple('Inputs', ['mouse_x', 'mouse_y', 'fire'])
+
+
+class Cloud:
+    def __init__(self, rng):
+        self.rng = rng
+        self.x = rng.randint(-100, WINDOW_WIDTH)
+        self.prev_x = self.x
+        self.y = rng.randint(0, WINDOW_HEIGHT//2)
+        self.speed = rng.uniform(0.2, 0.5)
+        self.size = rng.randint(40, 100)
+        self.circles = [(rng.randint(-20, 20), rng.randint(-20, 20),
+                        rng.randint(20, 40)) for _ in range(5)]
+
+    def move(self, scale=1.0):
+        self.prev_x = self.x
+        self.x += self.speed * scale
+        if self.x > WINDOW_WIDTH + 100:
+            self.x = self.prev_x = -100
+            self.y = self.rng.randint(0, WINDOW_HEIGHT//2)
+
+
+class Simulation:
+    """The whole game state and rules, without any display or pygame dependency.
+
+    Everything advances through step(), driven by the inputs and the elapsed time in
+    milliseconds, and all randomness comes from one seeded RNG, so the same seed and
+    the same inputs always produce the same game.
+    """
+
+    def __init__(self, seed=None, continuous=False):
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        # Swept bullet and bubble collisions, so nothing tunnels through small bubbles
+        # when steps are long or objects fast
+        self.continuous = continuous
+        self.rng = random.Random(self.seed)
+        self.time_ms = 0
+        self.profiler = None  # Set to a Profiler to time the stages of each step
+        self.score = 0
+        self.game_over = False
+        self.last_score_update = 0
+        self.player_pos = [WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2]
+        self.prev_player_pos = list(self.player_pos)
+        self.player_angle = 0
+        self.bee = BeeTransform()
+        self.crosshair_pos = [WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2]
+        self.spawn_level = 1
+        self.warning_time = 0
+        self.showing_warning = False
+        self.clouds = [Cloud(self.rng) for _ in range(5)]
+        self.bubbles = BubbleField()
+        self.last_bubble_spawn = 0
+        self.bubble_spawn_delay = 2000  # Start with 2 seconds
+        self.spawn_attempts = SPAWN_ATTEMPTS
+        self.spawned = 0  # Bubbles spawned, positions rejected for overlapping and spawns given up
+        self.spawn_rejections = 0
+        self.spawn_failures = 0
+        # Difficulty knobs, see tuner.py
+        self.spawn_delay_factor = 0.8  # Spawn delay multiplier per level
+        self.radius_weights = [0.8, 0.15, 0.05]  # Chances of a small, big and huge bubble
+        self.split_speed_increase = 1.5  # Halves fly off this much faster than their parent
+        self.min_speed_factor = MIN_SPEED_FACTOR
+        self.bullets = Pool(Bullet)
+        self.last_shot_time = 0
+        self.shot_delay = 250  # Delay between shots in milliseconds
+        self.bullet_speed = 10
+        self.min_bubble_radius = 10  # Minimum radius before bubble pops
+        self.split_depth = None  # Times a spawned bubble splits before its pieces pop, None for no limit
+        self.lives = 3
+        self.invincible = False
+        self.invincible_timer = 0
+        self.invincible_duration = 2000  # 2 seconds of invincibility after hit
+        self.hurt_effect_start = None
+        self.hurt_effect_duration = 500  # 500ms
+
+    def hurt_active(self):
+        return (self.hurt_effect_start is not None and
+                self.time_ms - self.hurt_effect_start < self.hurt_effect_duration)
+
+    def spawn_position(self, side, radius, speed):
+        """A random (x, y, dx, dy) just outside the given edge, heading inwards"""
+        rng = self.rng
+        if side == 'top':
+            x = rng.randint(0, WINDOW_WIDTH)
+            y = -radius * 2
+            dy = speed
+            dx = rng.uniform(-speed, speed)
+        elif side == 'right':
+            x = WINDOW_WIDTH + radius * 2
+            y = rng.randint(0, WINDOW_HEIGHT)
+            dx = -speed
+            dy = rng.uniform(-speed, speed)
+        elif side == 'bottom':
+            x = rng.randint(0, WINDOW_WIDTH)
+            y = WINDOW_HEIGHT + radius * 2
+            dy = -speed
+            dx = rng.uniform(-speed, speed)
+        else:  # left
+            x = -radius * 2
+            y = rng.randint(0, WINDOW_HEIGHT)
+            dx = speed
+            dy = rng.uniform(-speed, speed)
+        return x, y, dx, dy
+
+    def spawn_bubble(self):
+        rng = self.rng
+        side = rng.choice(['top', 'right', 'bottom', 'left'])
+        radius = rng.choices([rng.randint(10, 40), rng.randint(81, 100), rng.randint(200, 250)], self.radius_weights)[0]
+        base_speed = 2.0  # Base speed for the smallest bubble
+        speed = base_speed * (10 / radius)  # Adjust speed based on radius
+
+        # Ensure the new bubble does not spawn inside another bubble. Every position
+        # tried lies on the same line along the edge, so one index of the bubbles
+        # near that line serves all attempts.
+        line = {'top': -radius * 2, 'right': WINDOW_WIDTH + radius * 2,
+                'bottom': WINDOW_HEIGHT + radius * 2, 'left': -radius * 2}[side]
+        bubbles = self.bubbles
+        n = bubbles.count
+        nearby = StripIndex(bubbles.x[:n], bubbles.y[:n], bubbles.radius[:n], side in ('top', 'bottom'),
+                            line - radius, line + radius)
+        for _ in range(self.spawn_attempts):
+            x, y, dx, dy = self.spawn_position(side, radius, speed)
+            if not nearby.overlaps([x], [y], [radius])[0]:
+                break
+            self.spawn_rejections += 1
+        else:
+            self.spawn_failures += 1
+            return  # Do not spawn this bubble
+
+        # Add color and shine properties
+        color = rng.choice(BUBBLE_COLORS)
+        shine_offset = rng.randint(-radius//2, -radius//4)  # Position of shine relative to center
+
+        self.bubbles.add(x, y, dx, dy, radius, color, shine_offset)
+        self.spawned += 1
+
+    def spawn(self, current_time, scale):
+        """Spawn a bubble for every spawn delay that has passed.
+
+        Once the delay is shorter than a step, or with long steps, that is several per
+        step. scale, the length of this step in steps, is unused here; overrides that
+        spawn at a rate per second, like SwarmSimulation's, need it.
+        """
+        while current_time - self.last_bubble_spawn > self.bubble_spawn_delay:
+            self.spawn_bubble()
+            self.last_bubble_spawn += self.bubble_spawn_delay
+
+    def shoot(self, current_time):
+        if current_time - self.last_shot_time > self.shot_delay:
+            direction = math.radians(self.player_angle)
+            dx = math.cos(direction) * self.bullet_speed
+            dy = -math.sin(direction) * self.bullet_speed
+
+            bullet_x = self.player_pos[0] + 20 * math.cos(direction)
+            bullet_y = self.player_pos[1] - 20 * math.sin(direction)
+
+            bullet = self.bullets.acquire()
+            bullet.x = bullet.prev_x = bullet_x
+            bullet.y = bullet.prev_y = bullet_y
+            bullet.dx = dx
+            bullet.dy = dy
+            bullet.rotation = math.degrees(direction)
+            self.last_shot_time = current_time
+
+    def move_bullets(self, scale):
+        # Update bullet positions and drop the ones that left the screen. In continuous
+        # mode they are dropped after the hit test instead, so a bullet that crosses a
+        # bubble on its way off screen still hits it.
+        for bullet in self.bullets:
+            bullet.prev_x = bullet.x
+            bullet.prev_y = bullet.y
+            bullet.x += bullet.dx * scale
+            bullet.y += bullet.dy * scale
+        if not self.continuous:
+            self.cull_bullets()
+
+    def cull_bullets(self):
+        # Removing a bullet swaps the last one into its slot, so only advance past survivors
+        bullets = self.bullets
+        i = 0
+        while i < len(bullets):
+            bullet = bullets[i]
+            if (bullet.x < 0 or bullet.x > WINDOW_WIDTH or
+                bullet.y < 0 or bullet.y > WINDOW_HEIGHT):
+                bullets.release_at(i)
+                continue
+            i += 1
+
+    def collide_bubbles(self, scale):
+        self.bubbles.resolve_collisions(self.min_speed_factor, scale, self.continuous)
+
+    def split_bubbles(self, indices):
+        """Replace each bubble at indices with its two halves, or just pop it if it is too small.
+
+        The halves are appended in the order of indices, each pair moving apart along
+        its parent's direction of travel.
+        """
+        bubbles = self.bubbles
+        x, y = bubbles.x[indices], bubbles.y[indices]
+        dx, dy = bubbles.dx[indices], bubbles.dy[indices]
+        radius = bubbles.radius[indices]
+        color = bubbles.color[indices]
+        generation = bubbles.generation[indices]
+        removed = np.zeros(bubbles.count, dtype=bool)
+        removed[indices] = True
+        bubbles.compact(removed)
+
+        new_radius = radius / 2
+        speed_increase = self.split_speed_increase
+        split = radius > self.min_bubble_radius
+        if self.split_depth is not None:
+            split &= generation < self.split_depth
+        shine_offsets = []
+        for splits, half in zip(split.tolist(), new_radius.tolist()):
+            if splits:
+                shine_offsets.append((self.rng.randint(-int(half//2), -int(half//4)),
+                                      self.rng.randint(-int(half//2), -int(half//4))))
+        # Create two smaller bubbles
+        keep = new_radius[split] > self.min_bubble_radius
+        if not np.any(keep):
+            return
+        shine_offsets = np.array(shine_offsets, dtype=float)[keep]
+        dx = dx[split][keep] * speed_increase
+        dy = dy[split][keep] * speed_increase
+        bubbles.add_many(np.repeat(x[split][keep], 2), np.repeat(y[split][keep], 2),
+                         np.column_stack((dx, -dx)).ravel(), np.column_stack((dy, -dy)).ravel(),
+                         np.repeat(new_radius[split][keep], 2), np.repeat(color[split][keep], 2, axis=0),
+                         shine_offsets.ravel(), np.repeat(generation[split][keep] + 1, 2))
+
+    def hit_bubbles(self):
+        """Pop or split every bubble a bullet is inside, spending those bullets.
+
+        Each bullet hits the first bubble containing it, or in continuous mode the
+        first one its path ran into this step. A bubble hit by several bullets pops
+        once, for the earliest of them, and the others fly on.
+        """
+        bullets = self.bullets
+        count = len(bullets)
+        xs = np.fromiter((bullet.x for bullet in bullets), dtype=float, count=count)
+        ys = np.fromiter((bullet.y for bullet in bullets), dtype=float, count=count)
+        if self.continuous:
+            prev_xs = np.fromiter((bullet.prev_x for bullet in bullets), dtype=float, count=count)
+            prev_ys = np.fromiter((bullet.prev_y for bullet in bullets), dtype=float, count=count)
+            targets = self.bubbles.first_hits(xs, ys, prev_xs, prev_ys)
+        else:
+            targets = self.bubbles.first_hits(xs, ys)
+        hitting = np.flatnonzero(targets >= 0)
+        if len(hitting) == 0:
+            return
+
+        popped, first = np.unique(targets[hitting], return_index=True)
+        spent = hitting[first]
+        order = np.argsort(spent)  # Split in bullet order
+        self.split_bubbles(popped[order])
+        self.score += len(popped)
+        # Release from the back so the swap-remove never moves a bullet still to release
+        for index in sorted(spent.tolist(), reverse=True):
+            bullets.release_at(index)
+
+    def check_collision_with_bubbles(self):
+        """More precise collision detection using body segments"""
+        x, y = self.player_pos
+        bee = self.bee.update(x, y, self.player_angle)
+        return self.bubbles.touches_any(bee.segment_x, bee.segment_y, SEGMENT_RADIUS,
+                                        bound=(x, y, BOUND_RADIUS))
+
+    def move_player(self, mouse_x, mouse_y, scale=1.0):
+        # Update crosshair position to follow mouse directly
+        self.crosshair_pos[0] = mouse_x
+        self.crosshair_pos[1] = mouse_y
+
+        # Calculate player movement direction towards crosshair with delay
+        dx = self.crosshair_pos[0] - self.player_pos[0]
+        dy = self.crosshair_pos[1] - self.player_pos[1]
+        distance = math.hypot(dx, dy)
+
+        # Keep player at a minimum distance from crosshair
+        min_distance = 60
+        if distance > min_distance:
+            # Move player towards crosshair but stay behind it
+            target_x = self.crosshair_pos[0] - (dx/distance * min_distance)
+            target_y = self.crosshair_pos[1] - (dy/distance * min_distance)
+
+            # Smooth movement towards target position with speed control,
+            # closing the same fraction of the gap per second whatever the step size
+            follow = 1 - (1 - PLAYER_SPEED) ** scale
+            self.player_pos[0] += (target_x - self.player_pos[0]) * follow
+            self.player_pos[1] += (target_y - self.player_pos[1]) * follow
+
+        # Update player angle to face crosshair
+        if distance > 0:
+            self.player_angle = math.degrees(math.atan2(-dy, dx))
+
+    def step(self, inputs, dt_ms=STEP_MS):
+        """Advance the game by dt_ms milliseconds with the given inputs.
+
+        Movement is scaled by dt_ms / STEP_MS, so the game loop normally calls this
+        with the default fixed step and only headless tools use other step sizes.
+        """
+        profiler = self.profiler
+        self.time_ms += dt_ms
+        current_time = self.time_ms
+        scale = dt_ms / STEP_MS
+
+        self.prev_player_pos[0], self.prev_player_pos[1] = self.player_pos
+        self.move_player(inputs.mouse_x, inputs.mouse_y, scale)
+
+        # Handle shooting
+        if inputs.fire:
+            self.shoot(current_time)
+
+        if not self.game_over:
+            current_level = (self.score // 10) + 1
+
+            # Check if we need to increase spawn rate
+            if current_level > self.spawn_level:
+                self.spawn_level = current_level
+                self.bubble_spawn_delay *= self.spawn_delay_factor  # Spawn faster every level
+                self.warning_time = current_time
+                self.showing_warning = True
+
+            # Spawn new bubbles
+            self.spawn(current_time, scale)
+            if profiler is not None:
+                profiler.lap(SPAWN)
+
+            # Update bubble positions and rotation, then remove bubbles that are off screen
+            self.bubbles.integrate(scale)
+            self.bubbles.cull(WINDOW_WIDTH, WINDOW_HEIGHT)
+            if profiler is not None:
+                profiler.lap(INTEGRATE)
+
+            # Replace the old collision check with the new precise one
+            if not self.invincible and self.check_collision_with_bubbles():
+                self.lives -= 1
+                if self.lives <= 0:
+                    self.game_over = True
+                else:
+                    self.invincible = True
+                    self.invincible_timer = current_time
+                    self.hurt_effect_start = current_time
+
+            # Handle invincibility
+            if self.invincible:
+                if current_time - self.invincible_timer > self.invincible_duration:
+                    self.invincible = False
+
+            # Check collisions between bubbles
+            self.collide_bubbles(scale)
+            if profiler is not None:
+                profiler.lap(COLLIDE)
+
+            self.move_bullets(scale)
+
+            # Check bullet collisions with bubbles, all bullets at once
+            if len(self.bullets) and len(self.bubbles):
+                self.hit_bubbles()
+            if self.continuous:
+                self.cull_bullets()
+            if profiler is not None:
+                profiler.lap(BULLETS)
+
+            # Increase score by 1 point per second
+            if current_time - self.last_score_update >= 1000:
+                self.score += 1
+                self.last_score_update = current_time
+
+        for cloud in self.clouds:
+            cloud.move(scale)
+
+        # Show warning message for 2 seconds
+        if self.showing_warning and current_time - self.warning_time >= 2000:
+            self.showing_warning = False
@@ -0,0 +1,180 @@
+import math
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+# Bubble and stinger sprites are drawn without antialiasing, so every pixel is either
+# fully opaque or fully transparent. Marking the transparent ones with a colour key
+# instead of an alpha channel draws exactly the same picture, and the run-length
+# encoded blits are several times faster than alpha blending. No sprite uses magenta.
+COLORKEY = (255, 0, 255)
+
+
+def keyed_surface(size):
+    surface = pygame.Surface(size)
+    surface.fill(COLORKEY)
+    return surface
+
+
+def finish_keyed(surface):
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return surface
+
+
+class BubbleSpriteCache:
+    """Lazily rendered bubble sprites keyed by (radius, color, shine_offset, detailed).
+
+    Each sprite holds the filled bubble, its outline and its shine, so a bubble costs
+    one blit instead of three circle draws. Sprites that aren't detailed are just the
+    filled circle, for when the frame rate needs every bit of help. Least recently used sprites are evicted
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, highlight_color, max_bytes=32 * 1024 * 1024):
+        self.highlight_color = highlight_color
+        self.max_bytes = max_bytes
+        self.sprites = OrderedDict()  # key -> (surface, half_size)
+        self.bytes = 0
+
+    def clear(self):
+        self.sprites.clear()
+        self.bytes = 0
+
+    def render(self, radius, color, shine_offset, detailed=True):
+        shine_radius = max(3, radius // 4)
+        # Big enough for the bubble and for the shine of tiny bubbles poking past its edge
+        half = int(max(radius, abs(shine_offset) + shine_radius)) + 1
+        surface = keyed_surface((half * 2 + 1, half * 2 + 1))
+        center = (half, half)
+
+        # Draw main bubble
+        pygame.draw.circle(surface, color, center, radius)
+        if not detailed:
+            return finish_keyed(surface), half
+        # Draw outline
+        pygame.draw.circle(surface, self.highlight_color, center, radius, 1)
+        # Draw shine (smaller white circle)
+        shine_center = (int(half + shine_offset), int(half + shine_offset))
+        pygame.draw.circle(surface, self.highlight_color, shine_center, shine_radius)
+        return finish_keyed(surface), half
+
+    def blits(self, xs, ys, radius, color, shine_offset, detailed=True):
+        """(surface, position) pairs for bubbles given as NumPy arrays, centred on xs, ys.
+
+        The bubbles are grouped by sprite first, so the cache is asked once per
+        distinct sprite instead of once per bubble.
+        """
+        n = len(xs)
+        if n == 0:
+            return ()
+        _, radius_code = np.unique(radius, return_inverse=True)
+        _, shine_code = np.unique(shine_offset, return_inverse=True)
+        color = color.astype(np.int64)
+        key = ((radius_code * (int(shine_code.max()) + 1) + shine_code) << 24 |
+               color[:, 0] << 16 | color[:, 1] << 8 | color[:, 2])
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        surfaces = []
+        halves = []
+        for bubble_radius, bubble_color, bubble_shine in zip(radius[first].tolist(), color[first].tolist(),
+                                                              shine_offset[first].tolist()):
+            surface, half = self.get(bubble_radius, tuple(bubble_color), bubble_shine, detailed)
+            surfaces.append(surface)
+            halves.append(half)
+        half = np.array(halves)[inverse]
+        lefts = (xs.astype(int) - half).tolist()
+        tops = (ys.astype(int) - half).tolist()
+        return zip(map(surfaces.__getitem__, inverse.tolist()), zip(lefts, tops))
+
+    def get(self, radius, color, shine_offset, detailed=True):
+        """Return (surface, half_size); blit at the bubble centre minus half_size"""
+        key = (radius, color, shine_offset, detailed)
+        entry = self.sprites.get(key)
+        if entry is not None:
+            self.sprites.move_to_end(key)
+            return entry
+
+        entry = self.render(radius, color, shine_offset, detailed)
+        self.sprites[key] = entry
+        self.bytes += entry[0].get_width() * entry[0].get_height() * 4
+        while self.bytes > self.max_bytes and len(self.sprites) > 1:
+            _, (old, _) = self.sprites.popitem(last=False)
+            self.bytes -= old.get_width() * old.get_height() * 4
+        return entry
+
+
+class StingerSprites:
+    """The stinger triangle pre-rendered at every 360/steps degrees.
+
+    For swarm mode, where there are too many stingers to draw each as a polygon:
+    blits() turns whole arrays of positions and rotations into one screen.blits().
+    """
+
+    def __init__(self, color, steps=72, length=8, width=3):
+        self.steps = steps
+        self.half = length + 1
+        self.surfaces = []
+        for step in range(steps):
+            angle = 2 * math.pi * step / steps
+            surface = keyed_surface((self.half * 2 + 1, self.half * 2 + 1))
+            center = self.half
+            pygame.draw.polygon(surface, color, [
+                (center + length * math.cos(angle), center - length * math.sin(angle)),
+                (center + width * math.cos(angle + math.pi / 2), center - width * math.sin(angle + math.pi / 2)),
+                (center + width * math.cos(angle - math.pi / 2), center - width * math.sin(angle - math.pi / 2)),
+            ])
+            self.surfaces.append(finish_keyed(surface))
+
+    def blits(self, xs, ys, rotations):
+        """(surface, position) pairs for stingers centred on NumPy arrays xs, ys, rotated by rotations in degrees"""
+        steps = (rotations * (self.steps / 360)).round().astype(int) % self.steps
+        lefts = (xs - self.half).astype(int).tolist()
+        tops = (ys - self.half).astype(int).tolist()
+        return zip(map(self.surfaces.__getitem__, steps.tolist()), zip(lefts, tops))
+
+
+class CloudLayer:
+    """Cached sky background plus one pre-rendered alpha sprite per cloud.
+
+    A cloud's shape never changes (respawning only moves it), so its sprite is drawn
+    the first time the cloud is seen and reused until the cloud is garbage collected.
+    """
+
+    def __init__(self, size, sky_color, cloud_color, shadow_color):
+        self.cloud_color = cloud_color
+        self.shadow_color = shadow_color
+        self.background = pygame.Surface(size)
+        self.background.fill(sky_color)
+        if pygame.display.get_surface() is not None:
+            self.background = self.background.convert()
+        self.sprites = weakref.WeakKeyDictionary()  # cloud -> (surface, offset_x, offset_y)
+
+    def render(self, cloud):
+        # Bounding box of all circles relative to the cloud position, shadows included
+        left = min(offset_x - radius for offset_x, offset_y, radius in cloud.circles)
+        top = min(offset_y - radius for offset_x, offset_y, radius in cloud.circles)
+        right = max(offset_x + radius for offset_x, offset_y, radius in cloud.circles)
+        bottom = max(offset_y + radius + 2 for offset_x, offset_y, radius in cloud.circles)
+        surface = pygame.Surface((right - left + 1, bottom - top + 1), pygame.SRCALPHA)
+
+        for offset_x, offset_y, radius in cloud.circles:
+            # Draw cloud shadow
+            pygame.draw.circle(surface, self.shadow_color,
+                               (offset_x - left, offset_y - top + 2), radius)
+            # Draw cloud
+            pygame.draw.circle(surface, self.cloud_color,
+                               (offset_x - left, offset_y - top), radius)
+
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface, left, top
+
+    def get(self, cloud):
+        """Return (surface, offset_x, offset_y); blit at the cloud position plus the offsets"""
+        entry = self.sprites.get(cloud)
+        if entry is None:
+            entry = self.sprites[cloud] = self.render(cloud)
+        return entry
@@ -0,0 +1,156 @@
+"""Swarm mode: a showcase and load test with over ten thousand tiny bubbles.
+
+    python bubble_bee.py --swarm                  the default settings below
+    python bubble_bee.py --swarm swarm.json       any of them overridden from a JSON object
+
+Everything runs on whole arrays: bubbles spawn in batches, collide through a
+SortedGrid (BubbleField.resolve_collisions_batched) and stingers live in a
+StingerField instead of the bullet pool, so the cost per frame grows about
+linearly with the number of things on screen.
+"""
+import json
+import math
+
+import numpy as np
+
+from bubble_field import StructOfArrays
+from simulation import Simulation, BUBBLE_COLORS, WINDOW_WIDTH, WINDOW_HEIGHT, STEP_MS
+
+MAX_FIRE_GAP_MS = 100  # Holding fire again after a pause doesn't fire the whole pause's worth
+
+
+class SwarmConfig:
+    """The swarm mode's entity caps and rates"""
+
+    def __init__(self, spawn_rate=1500, max_bubbles=12000, split_depth=1, bullet_rate=1800,
+                 spread=60, radius=(2, 5), bubble_speed=0.6, min_speed_factor=0.02, lives=20):
+        # Bubbles count their splits in a uint8 and pop at no minimum size, so the
+        # split depth has to be a whole number in that range
+        if isinstance(split_depth, bool) or not isinstance(split_depth, int) or not 0 <= split_depth <= 255:
+            raise ValueError(f"split_depth must be a whole number from 0 to 255, not {split_depth!r}")
+        if len(radius) != 2 or not 1 <= radius[0] <= radius[1]:
+            raise ValueError(f"radius must be [smallest, biggest] with 1 <= smallest <= biggest, not {radius!r}")
+        self.spawn_rate = spawn_rate  # Bubbles per second
+        self.max_bubbles = max_bubbles  # No spawning while there are this many
+        self.split_depth = split_depth  # Times a spawned bubble splits before its pieces pop
+        self.bullet_rate = bullet_rate  # Stingers per second while firing
+        self.spread = spread  # Stingers fan out over this many degrees
+        self.radius = tuple(radius)  # Smallest and biggest spawned bubble
+        self.bubble_speed = bubble_speed  # Speed of the smallest bubbles, per step
+        self.min_speed_factor = min_speed_factor
+        self.lives = lives
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class StingerField(StructOfArrays):
+    """Struct-of-arrays stingers, laid out like BubbleField, for thousands at a time"""
+
+    fields = tuple((name, float, ()) for name in ('x', 'y', 'prev_x', 'prev_y', 'dx', 'dy', 'rotation'))
+
+    def __init__(self, capacity=256):
+        super().__init__(capacity)
+
+    def add_many(self, x, y, dx, dy, rotation):
+        new = self._append(len(dx))
+        self.x[new] = self.prev_x[new] = x
+        self.y[new] = self.prev_y[new] = y
+        self.dx[new] = dx
+        self.dy[new] = dy
+        self.rotation[new] = rotation
+
+
+class SwarmSimulation(Simulation):
+    """The game with the swarm settings and every per-step pass batched.
+
+    Randomness comes from a NumPy generator seeded with the game's seed, so a swarm
+    game is just as reproducible as a normal one.
+    """
+
+    def __init__(self, config=None, seed=None):
+        super().__init__(seed)
+        self.config = config if config is not None else SwarmConfig()
+        self.np_rng = np.random.default_rng(self.seed)
+        self.bullets = StingerField()
+        self.split_depth = self.config.split_depth
+        self.min_bubble_radius = 0
+        self.min_speed_factor = self.config.min_speed_factor
+        self.lives = self.config.lives
+        self.spawn_due = 0.0  # Bubbles and stingers owed by the rates, carried between steps
+        self.shots_due = 0.0
+        self.last_fire_time = 0
+
+    def spawn(self, current_time, scale):
+        config = self.config
+        self.spawn_due += config.spawn_rate * scale * STEP_MS / 1000
+        count = int(self.spawn_due)
+        self.spawn_due -= count
+        count = min(count, config.max_bubbles - len(self.bubbles))
+        if count <= 0:
+            return
+
+        # Same placement as spawn_bubble(): just outside a random edge, heading inwards
+        rng = self.np_rng
+        smallest, biggest = config.radius
+        radius = rng.integers(smallest, biggest, count, endpoint=True)
+        speed = config.bubble_speed * smallest / radius
+        side = rng.integers(0, 4, count)  # top, right, bottom, left
+        along = rng.uniform(0, 1, count)
+        drift = rng.uniform(-1, 1, count) * speed
+        vertical = side % 2 == 0
+        x = np.where(vertical, along * WINDOW_WIDTH, np.where(side == 1, WINDOW_WIDTH + radius * 2, -radius * 2))
+        y = np.where(vertical, np.where(side == 0, -radius * 2, WINDOW_HEIGHT + radius * 2), along * WINDOW_HEIGHT)
+        inwards = np.where((side == 0) | (side == 3), speed, -speed)
+        dx = np.where(vertical, drift, inwards)
+        dy = np.where(vertical, inwards, drift)
+        colors = np.array(BUBBLE_COLORS, dtype=np.uint8)[rng.integers(0, len(BUBBLE_COLORS), count)]
+        shine_offset = rng.integers(-(radius // 2), -(radius // 4), endpoint=True)
+        self.bubbles.add_many(x, y, dx, dy, radius, colors, shine_offset)
+        self.spawned += count
+
+    def shoot(self, current_time):
+        # Stingers are owed at bullet_rate per second for as long as fire is held
+        config = self.config
+        elapsed = min(current_time - self.last_fire_time, MAX_FIRE_GAP_MS)
+        self.last_fire_time = current_time
+        self.shots_due += elapsed * config.bullet_rate / 1000
+        count = int(self.shots_due)
+        self.shots_due -= count
+        if count == 0:
+            return
+
+        rotation = self.player_angle + self.np_rng.uniform(-config.spread / 2, config.spread / 2, count)
+        direction = np.radians(rotation)
+        dx = np.cos(direction) * self.bullet_speed
+        dy = -np.sin(direction) * self.bullet_speed
+        x = self.player_pos[0] + 20 * math.cos(math.radians(self.player_angle))
+        y = self.player_pos[1] - 20 * math.sin(math.radians(self.player_angle))
+        self.bullets.add_many(np.full(count, x), np.full(count, y), dx, dy, rotation)
+        self.last_shot_time = current_time
+
+    def move_bullets(self, scale):
+        self.bullets.integrate(scale)
+        self.bullets.cull(WINDOW_WIDTH, WINDOW_HEIGHT)
+
+    def collide_bubbles(self, scale):
+        self.bubbles.resolve_collisions_batched(self.min_speed_factor)
+
+    def hit_bubbles(self):
+        """Like Simulation.hit_bubbles(), with the stingers removed in one go"""
+        bullets = self.bullets
+        n = bullets.count
+        targets = self.bubbles.first_hits(bullets.x[:n], bullets.y[:n])
+        hitting = np.flatnonzero(targets >= 0)
+        if len(hitting) == 0:
+            return
+
+        popped, first = np.unique(targets[hitting], return_index=True)
+        spent = hitting[first]
+        self.split_bubbles(popped[np.argsort(spent)])
+        self.score += len(popped)
+        removed = np.zeros(n, dtype=bool)
+        removed[spent] = True
+        bullets.compact(removed)
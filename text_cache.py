@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """Fonts loaded once and rendered text surfaces memoized by (text, size, color, outline).
+
+    The HUD only changes when the score or lives change, so most frames reuse the
+    surfaces rendered earlier. The least recently used entries are dropped once
+    there are more than max_entries.
+    """
+
+    def __init__(self, sizes=(36, 48), max_entries=256):
+        self.fonts = {size: pygame.font.Font(None, size) for size in sizes}
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def render(self, text, size, color, outline_color=None, outline_width=2):
+        """Return (surface, offset); blit it at the text position plus offset.
+
+        With an outline colour the surface holds the text drawn four times shifted
+        diagonally by outline_width in that colour, with the text itself on top.
+        """
+        key = (text, size, color, outline_color)
+        entry = self.surfaces.get(key)
+        if entry is not None:
+            self.surfaces.move_to_end(key)
+            return entry
+
+        font = self.font(size)
+        text_surface = font.render(text, True, color)
+        if outline_color is None:
+            entry = (text_surface, (0, 0))
+        else:
+            outline_surface = font.render(text, True, outline_color)
+            step = outline_width * 2
+            surface = pygame.Surface((text_surface.get_width() + step, text_surface.get_height() + step),
+                                     pygame.SRCALPHA)
+            for x in (0, step):
+                for y in (0, step):
+                    surface.blit(outline_surface, (x, y))
+            surface.blit(text_surface, (outline_width, outline_width))
+            entry = (surface, (-outline_width, -outline_width))
+
+        self.surfaces[key] = entry
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return entry
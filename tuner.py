@@ -0,0 +1,148 @@
+"""Monte-Carlo difficulty tuning: many bot-played games for every combination of knobs.
+
+    python tuner.py --games 20 --out tuning.json
+
+Each combination of the values below plays the same seeds, so the combinations
+differ only in their settings. Games run in parallel in a process pool and end
+when the bot loses or after --max-seconds of game time. The results file holds
+the survival time and score distribution of every combination, and the share
+of spawns given up because the edge was too crowded.
+
+--coarse N runs the physics in N times longer steps with continuous collisions,
+which is about N times faster and close enough for comparing settings.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation import Simulation, Inputs, STEP_MS
+
+GRID = {
+    'spawn_delay_factor': [0.7, 0.8, 0.9],
+    'radius_weights': [(0.9, 0.08, 0.02), (0.8, 0.15, 0.05), (0.7, 0.2, 0.1)],
+    'split_speed_increase': [1.25, 1.5, 1.75],
+    'min_speed_factor': [0.1, 0.2, 0.3],
+}
+FLEE_DISTANCE = 60  # Run when a bubble's edge gets this close to the bee
+AIM_DISTANCE = 61  # Just past the bee's follow distance, so aiming barely moves it
+
+
+def bot_inputs(sim):
+    """Shoot the nearest bubble, or run from it if it is too close"""
+    player_x, player_y = sim.player_pos
+    bubbles = sim.bubbles
+    n = bubbles.count
+    if n == 0:
+        return Inputs(int(player_x + AIM_DISTANCE), int(player_y), True)
+
+    dx = bubbles.x[:n] - player_x
+    dy = bubbles.y[:n] - player_y
+    gap = (dx * dx + dy * dy) ** 0.5 - bubbles.radius[:n]
+    nearest = int(gap.argmin())
+    dx, dy, gap = dx[nearest].item(), dy[nearest].item(), gap[nearest].item()
+    distance = math.hypot(dx, dy) or 1.0
+    if gap < FLEE_DISTANCE:
+        # Put the crosshair far behind the bee so it turns around and flies off
+        target_x = player_x - dx / distance * 200
+        target_y = player_y - dy / distance * 200
+    else:
+        target_x = player_x + dx / distance * AIM_DISTANCE
+        target_y = player_y + dy / distance * AIM_DISTANCE
+    # Keep the crosshair on screen like a real mouse
+    target_x = min(max(target_x, 0), 1023)
+    target_y = min(max(target_y, 0), 1023)
+    return Inputs(int(target_x), int(target_y), True)
+
+
+def play(seed, settings, max_seconds, coarse=1):
+    sim = Simulation(seed, continuous=coarse > 1)
+    for name, value in settings.items():
+        setattr(sim, name, list(value) if isinstance(value, tuple) else value)
+    step = sim.step
+    step_ms = STEP_MS * coarse
+    for _ in range(int(max_seconds * 1000 / step_ms)):
+        step(bot_inputs(sim), step_ms)
+        if sim.game_over:
+            break
+    return sim.time_ms / 1000, sim.score, sim.game_over, sim.spawned, sim.spawn_failures
+
+
+def play_task(task):
+    """play() with its arguments in one tuple, for the worker processes"""
+    return play(*task)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(settings, games):
+    survival = sorted(seconds for seconds, score, lost, spawned, failed in games)
+    scores = sorted(score for seconds, score, lost, spawned, failed in games)
+    total_spawned = sum(game[3] for game in games)
+    total_failed = sum(game[4] for game in games)
+    return {
+        'settings': settings,
+        'games': len(games),
+        'lost': sum(lost for seconds, score, lost, spawned, failed in games),
+        # Spawns given up for lack of room; the spawn rate only means what it says while this is low
+        'spawn_failure_rate': total_failed / max(1, total_spawned + total_failed),
+        'survival_s': {'mean': statistics.fmean(survival), 'p10': percentile(survival, 0.1),
+                       'p50': percentile(survival, 0.5), 'p90': percentile(survival, 0.9)},
+        'score': {'mean': statistics.fmean(scores), 'p10': percentile(scores, 0.1),
+                  'p50': percentile(scores, 0.5), 'p90': percentile(scores, 0.9)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the difficulty settings with a bot")
+    parser.add_argument('--games', type=int, default=10, help="games per combination (default: %(default)s)")
+    parser.add_argument('--max-seconds', type=float, default=180,
+                        help="stop a game after this much game time (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--coarse', type=int, default=1, metavar='N',
+                        help="physics steps N times as long as in the game (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="first seed (default: %(default)s)")
+    parser.add_argument('--out', default='tuning.json', help="results file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    names = list(GRID)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*GRID.values())]
+    seeds = list(range(args.seed, args.seed + args.games))
+    # One task per game: game lengths vary a lot, so small tasks keep every worker busy
+    tasks = [(seed, settings, args.max_seconds, args.coarse) for settings in combinations for seed in seeds]
+
+    start = time.perf_counter()
+    games = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for done, game in enumerate(executor.map(play_task, tasks), 1):
+            games.append(game)
+            if done % len(seeds) == 0:
+                print(f"\r{done // len(seeds)}/{len(combinations)} combinations", end='', flush=True)
+    elapsed = time.perf_counter() - start
+    results = [summarize(settings, games[i * len(seeds):(i + 1) * len(seeds)])
+               for i, settings in enumerate(combinations)]
+    print(f"\r{len(combinations)} combinations x {args.games} games in {elapsed:.0f}s")
+
+    results.sort(key=lambda result: result['survival_s']['p50'])
+    for result in results:
+        settings = "  ".join(f"{name}={value}" for name, value in result['settings'].items())
+        print(f"survival p50 {result['survival_s']['p50']:6.1f}s  score p50 {result['score']['p50']:4}  "
+              f"spawns lost {result['spawn_failure_rate']:4.0%}  {settings}")
+
+    with open(args.out, 'w') as f:
+        json.dump({'games_per_combination': args.games, 'max_seconds': args.max_seconds, 'coarse': args.coarse,
+                   'seeds': [seeds[0], seeds[-1]], 'elapsed_s': elapsed, 'results': results}, f, indent=1)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())